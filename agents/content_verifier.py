@@ -2,7 +2,7 @@ from tools.content_verifier_tool import content_verifier_tool
 
 async def run_content_verifier_agent(state: dict) -> dict:
     """
-    Agent wrapper: extracts fields from state, calls the tool with a dict, merges output back.
+    Agent wrapper: extracts fields from state, calls the tool with a dict, returns only the verification result.
     """
     tool_result = await content_verifier_tool.ainvoke({
         "input_url": state.get("input_url", ""),
@@ -10,6 +10,5 @@ async def run_content_verifier_agent(state: dict) -> dict:
         "duplicate_check_result": state.get("duplicate_check_result"),
     })
 
-    # Merge tool output keys back into the full state
-    state.update(tool_result)
-    return state
+    # Return just the key this node owns so it can run alongside other branches
+    return {"content_verification_result": tool_result.get("content_verification_result")}
@@ -1,113 +1,367 @@
+import asyncio
 import os
+import time
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.docstore.document import Document
+from db.embedding_cache import CachedEmbeddings
+from db.docstore import SQLiteDocstore, import_pickle, normalize_title
+from db.near_duplicate_index import NEAR_DUP_ENABLED, near_duplicate_index
+from db.faiss_index import (
+    FAISS_INDEX_TYPE,
+    create_index,
+    index_type,
+    lock_store,
+    materialize,
+    read_index,
+    should_train_ivf,
+    snapshot,
+    train_ivf,
+    write_index,
+    write_snapshot,
+)
 
 # Paths
 FAISS_FOLDER = os.path.join("rag_store", "faiss_index")
 FAISS_PATH = os.path.join(FAISS_FOLDER, "index.faiss")
-PICKLE_PATH = os.path.join(FAISS_FOLDER, "index.pkl")  # consistent location
+DOCSTORE_PATH = os.path.join(FAISS_FOLDER, "docstore.sqlite")
+# Legacy files: the pickled docstore is imported once, the title index now lives in the docstore
+PICKLE_PATH = os.path.join(FAISS_FOLDER, "index.pkl")
+TITLE_INDEX_PATH = os.path.join(FAISS_FOLDER, "titles.json")
 
-# Load embedding model
-embedding_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+# "exact" answers from the title index alone; "near" also runs a vector search
+DUPLICATE_CHECK_MODE = os.getenv("DUPLICATE_CHECK_MODE", "exact")
+NEAR_DUPLICATE_MAX_DISTANCE = float(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "0.15"))
 
-# Load or create FAISS store
+# Write-behind persistence: flush after this many unsaved adds or this many seconds
+FAISS_FLUSH_EVERY = int(os.getenv("FAISS_FLUSH_EVERY", "25"))
+FAISS_FLUSH_INTERVAL = float(os.getenv("FAISS_FLUSH_INTERVAL", "30"))
+
+# Load embedding model behind the local embedding cache
+EMBEDDING_MODEL_NAME = "models/embedding-001"
+embedding_model = CachedEmbeddings(
+    GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL_NAME),
+    model_name=EMBEDDING_MODEL_NAME,
+)
+
+# Process-wide resident store, loaded once at startup and guarded for adds. The store
+# has a single writer: the process holding _store_lock, taken before the first load and
+# kept until exit. Another app process (e.g. a second uvicorn worker) fails to start.
+faiss_store = None
+_store_lock = None
+faiss_lock = asyncio.Lock()
+_dirty_count = 0
+_flush_wakeup = asyncio.Event()
+_flusher_task = None
+# One flush at a time, so an older snapshot never replaces a newer index file
+_save_lock = asyncio.Lock()
+# True while the resident index is a read-only memory map of the file on disk
+_index_mapped = False
+
+# Load or create FAISS store. The index file is memory-mapped when possible and documents
+# and titles are looked up in the append-only SQLite docstore on demand, so startup reads
+# neither the whole index nor every docstore row.
 def load_faiss():
-    if os.path.exists(FAISS_FOLDER) and os.path.exists(FAISS_PATH):
+    global _index_mapped
+    if os.path.exists(FAISS_PATH):
+        print("📂 Loading existing FAISS store...")
         try:
-            print("📂 Loading existing FAISS store...")
-            return FAISS.load_local(
-                folder_path=FAISS_FOLDER,
-                embeddings=embedding_model,
-                allow_dangerous_deserialization=True
-            )
+            index, mapped = read_index(FAISS_PATH)
         except Exception as e:
-            print(f"⚠️ Failed to load existing FAISS store: {e}")
+            print(f"❌ Failed to load existing FAISS store: {e}")
+            set_aside_store()
+        else:
+            store = open_store(index)
+            _index_mapped = mapped
+            return store
+    elif os.path.exists(DOCSTORE_PATH) or os.path.exists(PICKLE_PATH):
+        docstore = SQLiteDocstore(DOCSTORE_PATH)
+        indexed = docstore.count()
+        docstore.close()
+        if indexed or os.path.exists(PICKLE_PATH):
+            print(f"❌ {FAISS_PATH} is missing but {FAISS_FOLDER} still holds indexed documents")
+            set_aside_store()
 
-    # First-time setup
-    print("🆕 Creating new FAISS store...")
+    # First-time setup. Anything unusable was moved aside above, so the docstore here is
+    # new or empty; refuse to start rather than index on top of documents we can't place
+    print(f"🆕 Creating new FAISS store ({FAISS_INDEX_TYPE})...")
+    docstore = SQLiteDocstore(DOCSTORE_PATH)
+    if docstore.count():
+        raise RuntimeError(f"{DOCSTORE_PATH} holds documents but has no index; move {FAISS_FOLDER} aside and restart")
     dummy_doc = Document(
         page_content="This is a dummy description to initialize FAISS.",
         metadata={"title": "dummy_title"}
     )
-    store = FAISS.from_documents([dummy_doc], embedding_model)
-    store.save_local(FAISS_FOLDER)
-    return store
-
-# Save the FAISS store
-def save_faiss(store: FAISS):
+    dummy_embedding = embedding_model.embed_documents([dummy_doc.page_content])[0]
+    store = FAISS(embedding_model, create_index(len(dummy_embedding)), docstore, docstore.positions())
+    store.add_embeddings([(dummy_doc.page_content, dummy_embedding)], metadatas=[dummy_doc.metadata])
+    _index_mapped = False
     try:
-        print("💾 Saving FAISS store to existing directory...")
-        store.save_local(FAISS_FOLDER)
-        print(f"✅ Successfully saved FAISS store to {FAISS_FOLDER}")
+        save_faiss(store)
     except Exception as e:
         print(f"❌ Failed to save FAISS store: {e}")
         print("⚠️ Continuing without saving to disk...")
+    return store
+
+# Attach the docstore to an index read from disk
+def open_store(index) -> FAISS:
+    docstore = SQLiteDocstore(DOCSTORE_PATH)
+    if index_type(index) != FAISS_INDEX_TYPE and not (FAISS_INDEX_TYPE == "ivf" and index_type(index) == "flat"):
+        print(
+            f"⚠️ FAISS index is {index_type(index)} but FAISS_INDEX_TYPE is {FAISS_INDEX_TYPE}; "
+            f"run `python -m db.faiss_index migrate {FAISS_INDEX_TYPE}` to convert it"
+        )
+
+    # Stores saved before the SQLite docstore still have the pickle; import it once
+    if os.path.exists(PICKLE_PATH) and docstore.count() == 0:
+        try:
+            imported = import_pickle(PICKLE_PATH, docstore)
+        except Exception as e:
+            raise RuntimeError(
+                f"Could not import {PICKLE_PATH} ({e}); fix it or run `python -m db.docstore import` before starting"
+            ) from e
+        os.replace(PICKLE_PATH, PICKLE_PATH + ".imported")
+        print(f"📥 Imported {imported} documents from the pickled docstore")
+
+    # The docstore is committed before every index write, so after a crash it can only
+    # be ahead of the index; drop documents whose vectors were never saved
+    dropped = docstore.truncate(index.ntotal)
+    if dropped:
+        print(f"⚠️ Dropped {dropped} docstore entries with no saved vector")
+    if docstore.next_position < index.ntotal:
+        print(
+            f"❌ FAISS index has {index.ntotal} vectors but the docstore only "
+            f"{docstore.next_position}; searches may miss documents"
+        )
+        docstore.next_position = index.ntotal
+
+    return FAISS(embedding_model, index, docstore, docstore.positions())
+
+# Keep an unusable store for inspection (nothing in it is deleted) and start empty in its place
+def set_aside_store():
+    broken = f"{FAISS_FOLDER}.broken-{time.strftime('%Y%m%d-%H%M%S')}"
+    os.rename(FAISS_FOLDER, broken)
+    print(f"📁 Moved {FAISS_FOLDER} to {broken}")
+    print(
+        "❌ Starting an EMPTY duplicate store: previously indexed articles will not be detected as "
+        "duplicates. Restore it from Mongo with `python -m db.rebuild_duplicate_index` (stop the app first)"
+    )
+
+# Save the FAISS store. Documents are already on disk (append-only), so only the index
+# file is rewritten; the docstore is committed first so it never lags the index.
+# Raises on failure, so callers keep their changes pending for the next attempt.
+def save_faiss(store: FAISS, data=None):
+    print("💾 Saving FAISS store to existing directory...")
+    store.docstore.commit()
+    if data is None:
+        write_index(store.index, FAISS_PATH)
+    else:
+        write_snapshot(data, FAISS_PATH)
+    print(f"✅ Successfully saved FAISS store to {FAISS_FOLDER}")
+
+# Take the writer lock, then load the resident store once (off the event loop)
+async def init_faiss_store():
+    global faiss_store, _store_lock
+    if faiss_store is None:
+        if _store_lock is None:
+            _store_lock = await asyncio.to_thread(lock_store, FAISS_FOLDER)
+        faiss_store = await asyncio.to_thread(load_faiss)
+    return faiss_store
+
+def _mark_dirty():
+    global _dirty_count
+    _dirty_count += 1
+    if _dirty_count >= FAISS_FLUSH_EVERY:
+        _flush_wakeup.set()
+
+# Persist pending adds. The index is copied under the lock and written without it, so
+# adds and searches only wait for the in-memory copy, not the disk write.
+async def flush_faiss_store():
+    global _dirty_count, _index_mapped
+    if faiss_store is None or _dirty_count == 0:
+        return
+    async with _save_lock:
+        async with faiss_lock:
+            pending = _dirty_count
+            if pending == 0:
+                return
+            # IVF mode: switch from the exact index to a trained IVF once there is enough data
+            if should_train_ivf(faiss_store.index):
+                faiss_store.index = await asyncio.to_thread(train_ivf, faiss_store.index)
+                _index_mapped = False
+            data = await asyncio.to_thread(snapshot, faiss_store.index)
+        # Only count the adds as saved once the write succeeded; a failure leaves them pending
+        await asyncio.to_thread(save_faiss, faiss_store, data)
+        _dirty_count -= pending
+
+# Background flusher: wakes on the dirty threshold or the interval, whichever comes first
+async def _faiss_flusher():
+    while True:
+        try:
+            await asyncio.wait_for(_flush_wakeup.wait(), timeout=FAISS_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _flush_wakeup.clear()
+        try:
+            await flush_faiss_store()
+        except Exception as e:
+            print(f"❌ Background FAISS flush failed: {e}")
+
+def start_faiss_flusher():
+    global _flusher_task
+    if _flusher_task is None:
+        _flusher_task = asyncio.create_task(_faiss_flusher())
+
+# Stop the flusher and write out anything still pending (called on shutdown)
+async def stop_faiss_flusher():
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+    try:
+        await flush_faiss_store()
+    except Exception as e:
+        print(f"❌ Final FAISS flush failed, {_dirty_count} adds were not saved: {e}")
+
+# A memory-mapped index is read-only; copy it into memory before the first add.
+# Callers hold faiss_lock.
+async def _ensure_writable(store: FAISS):
+    global _index_mapped
+    if _index_mapped:
+        store.index = await asyncio.to_thread(materialize, store.index)
+        _index_mapped = False
 
 # Main duplicate checker agent
 async def run_duplicate_checker(state):
+    metadata = state.get("metadata")
+    if not metadata:
+        # Nothing was scraped; checking (and indexing) an empty article would only mislead
+        return {"error": state.get("error") or "No article metadata to check for duplicates"}
     try:
-        original_title = state["metadata"].get("title", "").strip()
-        meta_description = state["metadata"].get("meta_description", "").strip()
+        original_title = (metadata.get("title") or "").strip()
+        meta_description = (metadata.get("meta_description") or "").strip()
         title = original_title.lower()
         description = meta_description.lower()
         query = f"{title} - {description}"
+        normalized_title = normalize_title(original_title)
+
+        # Untitled pages would all match each other by title; check and index nothing for them
+        if not normalized_title:
+            print("⚠️ Article has no title; skipping the duplicate check")
+            return {"duplicate_check_result": "pass"}
 
         print(f"🔍 Checking for duplicate: '{title}'")
 
-        # Load FAISS
-        faiss_store = load_faiss()
+        store = await init_faiss_store()
 
-        try:
-            results = faiss_store.similarity_search(query, k=10)
-            print(f"📊 Found {len(results)} similar documents to check")
+        # Exact duplicates are answered from the docstore's title index, before any embedding call
+        if await asyncio.to_thread(store.docstore.has_title, normalized_title):
+            print(f"🔍 DUPLICATE DETECTED: '{normalized_title}' is already indexed")
+            return {"duplicate_check_result": "fail"}
 
-            for i, result in enumerate(results):
-                stored_title = result.metadata.get("title", "").strip().lower()
-                print(f"   {i+1}. Comparing: '{stored_title}' vs '{title}'")
-                if stored_title == title:
-                    print(f"🔍 DUPLICATE DETECTED: '{stored_title}' matches '{title}'")
-                    return {**state, "duplicate_check_result": "fail"}
+        # Reposts with edited titles: compare the SimHash of the article text (local, no network)
+        signature = state.get("content_signature")
+        if NEAR_DUP_ENABLED and signature:
+            match = await asyncio.to_thread(near_duplicate_index.find, int(signature, 16))
+            if match is not None:
+                print(f"🔍 NEAR DUPLICATE CONTENT: matches '{match['title']}' ({match['distance']} bits apart)")
+                return {"duplicate_check_result": "fail", "near_duplicate_of": match}
 
-            print(f"✅ No exact duplicates found for: '{title}'")
-        except Exception as search_error:
-            print(f"⚠️ Error during similarity search: {search_error}")
+        # Embed once outside the lock as a document, so stored and probed vectors are comparable;
+        # the same vector is reused for the add below
+        query_embedding = (await embedding_model.aembed_documents([query]))[0]
+
+        if DUPLICATE_CHECK_MODE == "near":
+            try:
+                async with faiss_lock:
+                    results = store.similarity_search_with_score_by_vector(query_embedding, k=10)
+                print(f"📊 Found {len(results)} similar documents to check")
+
+                for i, (result, distance) in enumerate(results):
+                    stored_title = result.metadata.get("title", "").strip().lower()
+                    print(f"   {i+1}. Comparing: '{stored_title}' vs '{title}' (distance {distance:.4f})")
+                    if distance <= NEAR_DUPLICATE_MAX_DISTANCE:
+                        print(f"🔍 NEAR DUPLICATE DETECTED: '{stored_title}' matches '{title}'")
+                        # Same shape as a SimHash match, so the stored result of the original is found
+                        return {
+                            "duplicate_check_result": "fail",
+                            "near_duplicate_of": {
+                                "url": result.metadata.get("url", ""),
+                                "title": result.metadata.get("original_title") or stored_title,
+                                "distance": float(distance),
+                            },
+                        }
+
+                print(f"✅ No near duplicates found for: '{title}'")
+            except Exception as search_error:
+                print(f"⚠️ Error during similarity search: {search_error}")
 
         # Clean metadata before saving
         clean_metadata = {
             "title": str(title),
-            "original_title": str(original_title)
+            "original_title": str(original_title),
+            "normalized_title": normalized_title,
+            "url": state.get("input_url", ""),
         }
 
-        new_doc = Document(
-            page_content=query,
-            metadata=clean_metadata
-        )
-        faiss_store.add_documents([new_doc])
-        save_faiss(faiss_store)
+        async with faiss_lock:
+            # Another request may have added the same title while we were embedding
+            if await asyncio.to_thread(store.docstore.has_title, normalized_title):
+                print(f"🔍 DUPLICATE DETECTED: '{normalized_title}' was just indexed")
+                return {"duplicate_check_result": "fail"}
+            # ...or a repost of the same content under another title
+            if NEAR_DUP_ENABLED and signature:
+                match = await asyncio.to_thread(near_duplicate_index.find, int(signature, 16))
+                if match is not None:
+                    print(f"🔍 NEAR DUPLICATE CONTENT: matches '{match['title']}', which was just indexed")
+                    return {"duplicate_check_result": "fail", "near_duplicate_of": match}
+            await _ensure_writable(store)
+            # Off the loop: the docstore insert may fsync, depending on DOCSTORE_SYNCHRONOUS
+            await asyncio.to_thread(
+                store.add_embeddings, [(query, query_embedding)], metadatas=[clean_metadata]
+            )
+            _mark_dirty()
+            if NEAR_DUP_ENABLED and signature:
+                await asyncio.to_thread(
+                    near_duplicate_index.add, int(signature, 16), state.get("input_url", ""), original_title
+                )
         print(f"✅ New entry added: '{title}'")
 
-        return {**state, "duplicate_check_result": "pass"}
+        return {"duplicate_check_result": "pass"}
 
     except Exception as e:
         print(f"❌ Error in duplicate checker: {e}")
-        return {**state, "duplicate_check_result": "pass"}
+        return {"duplicate_check_result": "pass"}
 
-# ClearingFAISS store for dev resets
-def clear_faiss_store():
-    try:
-        if os.path.exists(FAISS_PATH):
-            os.remove(FAISS_PATH)
-        if os.path.exists(PICKLE_PATH):
-            os.remove(PICKLE_PATH)
-        print("🗑️ FAISS store cleared")
-    except Exception as e:
-        print(f"❌ Error clearing FAISS store: {e}")
+def _remove_store_files():
+    near_duplicate_index.clear()
+    for path in (FAISS_PATH, DOCSTORE_PATH, DOCSTORE_PATH + "-wal", DOCSTORE_PATH + "-shm", PICKLE_PATH, TITLE_INDEX_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+# Clearing FAISS store for dev resets (under the lock, with the disk work off the loop)
+async def clear_faiss_store():
+    global faiss_store, _dirty_count, _index_mapped
+    async with faiss_lock:
+        if faiss_store is not None:
+            await asyncio.to_thread(faiss_store.docstore.close)
+        faiss_store = None
+        _dirty_count = 0
+        _index_mapped = False
+        try:
+            await asyncio.to_thread(_remove_store_files)
+            print("🗑️ FAISS store cleared")
+        except Exception as e:
+            print(f"❌ Error clearing FAISS store: {e}")
 
 # Debug function to inspect stored titles
 def debug_faiss_contents():
     try:
-        store = load_faiss()
+        store = faiss_store or load_faiss()
         all_docs = store.similarity_search("", k=100)
         print(f"📋 FAISS store contains {len(all_docs)} documents:")
         for i, doc in enumerate(all_docs):
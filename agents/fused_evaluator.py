@@ -0,0 +1,58 @@
+import json
+from langchain_core.output_parsers import JsonOutputParser
+from core.gemini import ScheduledChatModel
+from prompts.fused_evaluation_prompt import fused_evaluation_prompt
+from tools.trend_analyzer_tool import tavily_trend_check_tool
+from db.llm_cache import get_llm_cache
+from core.metrics import llm_callbacks
+from core.llm_scheduler import llm_scheduler
+
+llm = ScheduledChatModel(model="gemini-2.0-flash", temperature=0, cache=get_llm_cache("fused_evaluator"), callbacks=llm_callbacks("gemini-2.0-flash"))
+chain = fused_evaluation_prompt | llm | JsonOutputParser()
+
+# Keys the compile step would otherwise produce; if any is missing it runs after all
+COMPILED_KEYS = ("content_summary", "content_exists", "ai_scores", "recommendations", "detailed_feedback")
+
+async def run_fused_evaluator(state: dict) -> dict:
+    """
+    Fused mode: one structured-output call produces the OKR, the verification scores,
+    the discrepancy analysis and (usually) the compiled report. Returns state keys in the
+    same shape the staged nodes write, so ResultsCompiler handles both modes.
+    """
+    metadata = state.get("metadata") or {}
+    title = metadata.get("title", "")
+    description = metadata.get("meta_description", "")
+
+    # The objective isn't known before the call, so the trend lookup keys on the title
+    keywords = title.split()[:10]
+    trend_data = await tavily_trend_check_tool.ainvoke({"keywords": keywords})
+
+    input_vars = {
+        "title": title,
+        "meta_description": description,
+        "trend_score": trend_data.get("trend_score", 0),
+        "trend_summary": trend_data.get("trend_summary", ""),
+        "article_text": state.get("article_text", ""),
+    }
+
+    try:
+        result = await llm_scheduler.run(llm.model, lambda: chain.ainvoke(input_vars))
+    except Exception as e:
+        print(f"❌ Error in fused evaluator: {e}")
+        result = {}
+
+    compiled = result.get("compiled")
+    if not isinstance(compiled, dict) or any(key not in compiled for key in COMPILED_KEYS):
+        compiled = None
+
+    return {
+        "parsed_okr": {
+            "objective": result.get("objective", ""),
+            "key_results": result.get("key_results", []),
+        },
+        "content_verification_result": json.dumps(result.get("verification") or {}),
+        "discrepancy_report": json.dumps(result.get("discrepancy") or {}),
+        "trend_score": trend_data.get("trend_score", 0),
+        "trend_summary": trend_data.get("trend_summary", ""),
+        "compiled_results": compiled,
+    }
@@ -1,13 +1,19 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain.chains import LLMChain
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.gemini import ScheduledChatModel
 from prompts.okr_parser_prompt import OKR_PARSER_TEMPLATE
+from db.llm_cache import get_llm_cache
+from core.metrics import llm_callbacks
+from core.llm_scheduler import llm_scheduler
 
 from tools.linkedin_scraper_tool import scrape_linkedin_article
+from tools.article_compressor import compress_article
+from db.near_duplicate_index import content_signature
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -16,7 +22,7 @@ prompt =PromptTemplate(template=OKR_PARSER_TEMPLATE, input_variables=["article_t
  
 
 # Gemini LLM
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
+llm = ScheduledChatModel(model="gemini-2.0-flash", temperature=0, cache=get_llm_cache("okr_parser"), callbacks=llm_callbacks("gemini-2.0-flash"))
 
 # Output parser
 parser = JsonOutputParser()
@@ -24,19 +30,37 @@ parser = JsonOutputParser()
 # Define LLM chain
 chain = LLMChain(llm=llm, prompt=prompt, output_parser=parser)
 
-# Agent function
-async def run_parser_agent(state):
-    url = state["input_url"]
+# Scrape, then compress the article text down to the prompt budget and take its
+# near-duplicate signature (both off the event loop)
+async def fetch_article(url: str) -> dict:
     scraped = await scrape_linkedin_article(url)
 
     if "error" in scraped:
         return {"error": scraped["error"]}
 
-    article_text = scraped["text"]
-    result = chain.run(article_text=article_text)
-
+    article_text, compression = await asyncio.to_thread(compress_article, scraped["paragraphs"])
+    signature = await asyncio.to_thread(content_signature, scraped["paragraphs"])
     return {
-        "parsed_okr": result,
+        "article_text": article_text,
+        "compression": compression,
+        "content_signature": signature,
         "metadata": scraped["metadata"],
-        "title": scraped["metadata"].get("title")  
+        "title": scraped["metadata"].get("title")
     }
+
+# Scrape-only node used by the fused pipeline; the article text is handed to the fused call
+async def run_article_fetcher(state):
+    return await fetch_article(state["input_url"])
+
+# Agent function
+async def run_parser_agent(state):
+    fetched = await fetch_article(state["input_url"])
+
+    if "error" in fetched:
+        return fetched
+
+    article_text = fetched.pop("article_text")
+    # Async call through the shared scheduler so the event loop is never blocked
+    result = await llm_scheduler.run(llm.model, lambda: chain.arun(article_text=article_text))
+
+    return {"parsed_okr": result, **fetched}
@@ -1,7 +1,8 @@
 from tools.results_compiler_tool import compile_results_tool
 import json
 import re
-from db.mongo_client import results_collection
+from db.result_writer import result_writer
+from agents.duplicate_checker import normalize_title
 from datetime import datetime
 
 async def run_results_compiler(state: dict) -> dict:
@@ -52,11 +53,15 @@ async def run_results_compiler(state: dict) -> dict:
         "discrepancy_report": discrepancy_report,
     }
 
-    compiled_result = await compile_results_tool.ainvoke(tool_input)
+    # The fused evaluator may already have compiled the report; only call the LLM if not
+    compiled_result = state.get("compiled_results")
+    if not compiled_result:
+        compiled_result = await compile_results_tool.ainvoke(tool_input)
 
     document = {
         "timestamp": datetime.utcnow(),
         "input_url": state.get("input_url", ""),
+        "normalized_title": normalize_title(title),
         "objective": objective,
         "key_results": key_results,
         "metadata": metadata,
@@ -71,7 +76,7 @@ async def run_results_compiler(state: dict) -> dict:
         "compiled_result": compiled_result,
     }
 
-    await results_collection.insert_one(document)
+    # Buffered: grouped into insert_many batches off the request path
+    await result_writer.write(document)
 
-    state["compiled_results"] = compiled_result
-    return state
+    return {"compiled_results": compiled_result}
@@ -0,0 +1,49 @@
+from agents.duplicate_checker import normalize_title
+from db.mongo_client import get_results_collection
+from db.result_writer import result_writer
+
+async def run_stored_result_loader(state: dict) -> dict:
+    """
+    Duplicate path: serve the previously compiled result for this article instead of re-running
+    the trend, discrepancy and compile stages. Matches on the indexed input_url or normalized_title,
+    of this article or of the original a near-duplicate match points to.
+    """
+    metadata = state.get("metadata") or {}
+    normalized_title = normalize_title(metadata.get("title", ""))
+    candidates = [(state.get("input_url", ""), normalized_title)]
+    near_duplicate_of = state.get("near_duplicate_of")
+    if near_duplicate_of:
+        candidates.append((near_duplicate_of.get("url") or "", normalize_title(near_duplicate_of.get("title"))))
+
+    # Empty values would match every other untitled (or URL-less) result
+    clauses = [
+        clause
+        for url, title in candidates
+        for clause in ({"input_url": url} if url else None, {"normalized_title": title} if title else None)
+        if clause is not None
+    ]
+    document = None
+    if clauses:
+        try:
+            document = await get_results_collection().find_one({"$or": clauses}, sort=[("timestamp", -1)])
+        except Exception as e:
+            print(f"❌ Failed to look up stored result: {e}")
+
+    # The original may still be buffered in the result writer
+    for url, title in candidates:
+        if document is not None:
+            break
+        document = result_writer.find_pending(url, title)
+
+    if document is None:
+        print(f"⚠️ No stored result found for duplicate: '{normalized_title}'")
+        return {"compiled_results": None}
+
+    stored_id = str(document.get("_id", "pending"))
+    print(f"📦 Serving stored result {stored_id} for duplicate: '{normalized_title}'")
+    return {
+        "duplicate_of": stored_id,
+        "trend_score": document.get("trend_score"),
+        "discrepancy_report": document.get("discrepancy_report"),
+        "compiled_results": document.get("compiled_result"),
+    }
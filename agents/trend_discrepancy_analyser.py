@@ -1,9 +1,12 @@
 # agents/trend_discrepancy_analyzer.py
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.gemini import ScheduledChatModel
 from prompts.trend_discrepancy_prompt import trend_discrepancy_prompt
 from tools.trend_analyzer_tool import tavily_trend_check_tool
+from db.llm_cache import get_llm_cache
+from core.metrics import llm_callbacks
+from core.llm_scheduler import llm_scheduler
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+llm = ScheduledChatModel(model="gemini-2.0-flash", cache=get_llm_cache("trend_discrepancy"), callbacks=llm_callbacks("gemini-2.0-flash"))
 chain = trend_discrepancy_prompt | llm
 
 async def run_trend_discrepancy_analyzer(state: dict) -> dict:
@@ -11,7 +14,7 @@ async def run_trend_discrepancy_analyzer(state: dict) -> dict:
     1. Extract keywords from OKR or metadata
     2. Call Tavily tool to get trend data
     3. Call LLM with trend + OKR info to find discrepancies
-    4. Return updated state with discrepancy report
+    4. Return the discrepancy report and trend fields (only the keys this node changes)
     """
     objective = state.get("parsed_okr", {}).get("objective", "")
     key_results = state.get("parsed_okr", {}).get("key_results", [])
@@ -36,10 +39,11 @@ async def run_trend_discrepancy_analyzer(state: dict) -> dict:
         "trend_summary": trend_data["trend_summary"],
     }
 
-    discrepancy_report = await chain.ainvoke(input_vars)
+    discrepancy_report = await llm_scheduler.run(llm.model, lambda: chain.ainvoke(input_vars))
 
-    # Step 4: Update state with discrepancy report (raw string or parsed JSON)
-    state["discrepancy_report"] = discrepancy_report.content.strip()
-    state["trend_score"] = trend_data.get("trend_score", 0)
-    state["trend_summary"] = trend_data.get("trend_summary", "")
-    return state
+    # Step 4: Return discrepancy report (raw string or parsed JSON) and trend data
+    return {
+        "discrepancy_report": discrepancy_report.content.strip(),
+        "trend_score": trend_data.get("trend_score", 0),
+        "trend_summary": trend_data.get("trend_summary", ""),
+    }
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# Simulated model latency; jitter is a +/- fraction of the base latency
+BENCH_LLM_LATENCY_MS = float(os.getenv("BENCH_LLM_LATENCY_MS", "300"))
+BENCH_EMBED_LATENCY_MS = float(os.getenv("BENCH_EMBED_LATENCY_MS", "50"))
+BENCH_LATENCY_JITTER = float(os.getenv("BENCH_LATENCY_JITTER", "0.2"))
+
+EMBEDDING_DIMENSIONS = 768
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def simulated_latency(base_ms: float) -> float:
+    return max(0.0, base_ms * random.uniform(1 - BENCH_LATENCY_JITTER, 1 + BENCH_LATENCY_JITTER)) / 1000
+
+
+def _score(prompt: str, salt: str, low: int, high: int) -> int:
+    digest = hashlib.sha256(f"{salt}\0{prompt}".encode("utf-8")).digest()
+    return low + digest[0] % (high - low + 1)
+
+
+def canned_response(prompt: str) -> str:
+    """Well-formed output for whichever of the pipeline prompts this is, with scores varied per prompt."""
+    okr = {
+        "objective": "Grow qualified pipeline through a focused content program",
+        "key_results": [
+            "Increase monthly qualified leads by 25%",
+            "Publish 12 long-form articles this quarter",
+            "Raise newsletter conversion to 4%",
+        ],
+    }
+    verification = {
+        "relevance": _score(prompt, "relevance", 25, 50),
+        "credibility": _score(prompt, "credibility", 15, 30),
+        "completeness": _score(prompt, "completeness", 8, 20),
+    }
+    verification["verdict"] = "pass" if sum(verification.values()) >= 60 else "fail"
+    discrepancy = {
+        "discrepancy_found": verification["verdict"] == "fail",
+        "issues": ["Key results lack a baseline"],
+        "suggestions": ["State the starting value for each key result"],
+    }
+    scores = {key: verification[key] for key in ("relevance", "credibility", "completeness")}
+    compiled = {
+        "content_summary": "The article describes a content-led growth plan. It sets lead and conversion targets for the quarter.",
+        "content_exists": True,
+        "ai_scores": {**scores, "total": sum(scores.values())},
+        "recommendations": [
+            "Add baselines to each key result",
+            "Tie content output to pipeline metrics",
+            "Review progress monthly",
+        ],
+        "detailed_feedback": "The objective is clear and the key results are measurable. Baselines are missing.",
+    }
+
+    # Checked most specific first: the fused prompt also mentions extraction and evaluation
+    if "OKR extraction and evaluation assistant" in prompt:
+        return json.dumps({**okr, "verification": verification, "discrepancy": discrepancy, "compiled": compiled})
+    if "extracting Objectives and Key Results" in prompt:
+        return json.dumps(okr)
+    if "content evaluation agent" in prompt:
+        return f"```json\n{json.dumps(verification, indent=2)}\n```"
+    if "analyzes discrepancies" in prompt:
+        return json.dumps(discrepancy)
+    if "OKR evaluation assistant" in prompt:
+        return json.dumps(compiled)
+    return "{}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Stand-in for ChatGoogleGenerativeAI: same constructor kwargs, canned JSON after a simulated delay."""
+
+    model: str = "fake-chat"
+    temperature: Optional[float] = None
+    latency_ms: float = BENCH_LLM_LATENCY_MS
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        prompt = "\n".join(str(message.content) for message in messages)
+        message = AIMessage(content=canned_response(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(simulated_latency(self.latency_ms))
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(simulated_latency(self.latency_ms))
+        return self._respond(messages)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Stand-in for GoogleGenerativeAIEmbeddings: hashed bag-of-words vectors, so identical
+    and near-identical texts land close together, as they would with the real model.
+    """
+
+    def __init__(self, model: str = "fake-embedding", latency_ms: float = BENCH_EMBED_LATENCY_MS, **kwargs: Any):
+        self.model = model
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * EMBEDDING_DIMENSIONS
+        for word in WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(simulated_latency(self.latency_ms))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(simulated_latency(self.latency_ms))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,370 @@
+"""
+Offline end-to-end load test. Boots the FastAPI app in-process with Gemini, Tavily, the
+article sites and Mongo replaced by local stand-ins, drives concurrent /parse-okr/ load and
+reports latency percentiles, throughput and a per-graph-node time breakdown.
+
+    pip install -r bench/requirements.txt
+    python -m bench.load_test --requests 200 --concurrency 16 --fail-p99-ms 5000
+
+Every run works in a fresh temporary directory, so the FAISS store and local caches of the
+checkout are never touched. Stand-in latencies are set with BENCH_LLM_LATENCY_MS,
+BENCH_EMBED_LATENCY_MS, BENCH_UPSTREAM_LATENCY_MS and BENCH_TAVILY_LATENCY_MS.
+
+After the load the run checks that a failed scrape is reported and not cached, and that
+every compiled result reached Mongo and the dashboard rollups; a failed check exits 1.
+
+With the stand-ins at a few milliseconds, latency is bound by CPU, not by waiting: each
+request costs on the order of 100-150ms of process CPU, most of it LangChain serializing
+the runnables (dumpd, which reads node and lambda source via inspect) on every chain and
+graph node start. Everything shares one event loop, so at concurrency N a request waits
+behind roughly N others' CPU, and p50 grows to about N times that cost. The report's
+cpu_ms_per_request shows this floor; compare it with p50 before blaming the stand-ins.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Model lanes are opened wide so the benchmark measures the pipeline, not the quota
+UNTHROTTLED_MODEL_LIMITS = {
+    "gemini-2.0-flash": {"concurrency": 256, "rpm": 1e9},
+    "gemini-1.5-flash": {"concurrency": 256, "rpm": 1e9},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for the OKR pipeline")
+    parser.add_argument("--requests", type=int, default=100, help="timed /parse-okr/ requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--unique-urls", type=int, default=None,
+                        help="distinct article URLs to cycle through (default: one per request)")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests sent first")
+    parser.add_argument("--stream-samples", type=int, default=20,
+                        help="runs through /parse-okr/stream for the per-node breakdown (0 to skip)")
+    parser.add_argument("--mode", choices=["staged", "fused"], default="staged")
+    parser.add_argument("--with-caches", action="store_true",
+                        help="keep the LLM, trend and URL result caches enabled")
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="keep the configured per-model LLM limits instead of lifting them")
+    parser.add_argument("--fail-p99-ms", type=float, default=None,
+                        help="exit non-zero if p99 latency exceeds this many milliseconds")
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    parser.add_argument("--workdir", default=None, help="working directory (default: a temporary one)")
+    return parser.parse_args()
+
+
+def configure_environment(args, workdir: str):
+    # Settings are read at import time, so this must run before the app is imported
+    os.environ.setdefault("CACHE_DIR", os.path.join(workdir, ".cache"))
+    os.environ.setdefault("DATA_DIR", os.path.join(workdir, "data"))
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    os.environ.setdefault("TAVILY_API_KEY", "bench")
+    os.environ.setdefault("PIPELINE_MODE", args.mode)
+    if not args.with_caches:
+        os.environ.setdefault("LLM_CACHE_MODE", "off")
+        os.environ.setdefault("TREND_CACHE_TTL", "0")
+        os.environ.setdefault("TREND_CACHE_STALE_TTL", "0")
+        os.environ.setdefault("URL_RESULT_TTL", "0")
+    if not args.respect_rate_limits:
+        os.environ.setdefault("LLM_MODEL_LIMITS", json.dumps(UNTHROTTLED_MODEL_LIMITS))
+
+
+def install_stand_ins(stub_base_url: str):
+    """Swap the Gemini clients and the Mongo driver for local fakes before the app imports them."""
+    try:
+        import mongomock_motor
+    except ImportError:
+        sys.exit("mongomock-motor is required: pip install -r bench/requirements.txt")
+
+    import langchain_google_genai
+    from bench.fakes import FakeChatModel, FakeEmbeddings
+
+    os.environ["TAVILY_API_URL"] = f"{stub_base_url}/search"
+    langchain_google_genai.ChatGoogleGenerativeAI = FakeChatModel
+    langchain_google_genai.GoogleGenerativeAIEmbeddings = FakeEmbeddings
+
+    import db.mongo_client
+    db.mongo_client.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    accept_bulk_sort()
+
+
+def accept_bulk_sort():
+    """
+    pymongo >= 4.11 passes sort= to every bulk UpdateOne/ReplaceOne, which mongomock's bulk
+    builder rejects, so every rollup bulk_write failed. Nothing here sorts, so drop it.
+    """
+    import inspect
+    from mongomock.collection import BulkOperationBuilder
+
+    for name in ("add_update", "add_replace"):
+        method = getattr(BulkOperationBuilder, name)
+        if "sort" in inspect.signature(method).parameters:
+            continue
+
+        def without_sort(self, *args, _method=method, sort=None, **kwargs):
+            if sort is not None:
+                raise NotImplementedError("mongomock bulk writes do not support sort")
+            return _method(self, *args, **kwargs)
+
+        setattr(BulkOperationBuilder, name, without_sort)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize_latencies(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1) if values else 0.0,
+        "mean": round(sum(values) / len(values), 1) if values else 0.0,
+    }
+
+
+async def timed_requests(client, urls: List[str], concurrency: int, mode: str) -> List[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(url: str) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/parse-okr/", params={"url": url, "mode": mode})
+                body = response.json()
+                ok = response.status_code == 200 and isinstance(body, dict) and not body.get("error")
+                error = None if ok else (body.get("error") if isinstance(body, dict) else None) or f"HTTP {response.status_code}"
+            except Exception as e:
+                ok, error = False, str(e)
+            return {"url": url, "ok": ok, "error": error, "latency_ms": (time.perf_counter() - started) * 1000}
+
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+def parse_sse(text: str) -> List[dict]:
+    events = []
+    for block in text.split("\n\n"):
+        event, data = None, None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        if event:
+            events.append({"event": event, "data": data})
+    return events
+
+
+async def node_breakdown(client, urls: List[str], concurrency: int, mode: str) -> Dict[str, dict]:
+    """
+    Streams each URL with request tracing on and reports, per graph node, its own wall time
+    (from the node's trace span) next to the stream step time. Nodes that run in the same
+    parallel step (ContentVerifier and TrendDiscrepancyAnalyzer) each report that whole
+    step's time as step_ms, so step times overlap and do not add up to the request time.
+    """
+    import core.tracing
+
+    semaphore = asyncio.Semaphore(concurrency)
+    wall: Dict[str, List[float]] = defaultdict(list)
+    steps: Dict[str, List[float]] = defaultdict(list)
+
+    async def one(index: int, url: str):
+        request_id = f"bench-stream-{index}"
+        async with semaphore:
+            response = await client.get(
+                "/parse-okr/stream", params={"url": url, "mode": mode}, headers={"X-Request-ID": request_id}
+            )
+            for event in parse_sse(response.text):
+                if event["event"] == "node":
+                    steps[event["data"]["node"]].append(event["data"]["step_ms"])
+        trace = await client.get(f"/traces/{request_id}")
+        if trace.status_code == 200:
+            for span in trace.json()["spans"]:
+                if span["name"].startswith("node:"):
+                    wall[span["name"][len("node:"):]].append(span["duration_ms"])
+
+    # Tracing is left off for the timed requests so span recording doesn't skew them
+    core.tracing.TRACE_REQUESTS = True
+    try:
+        await asyncio.gather(*(one(index, url) for index, url in enumerate(urls)))
+    finally:
+        core.tracing.TRACE_REQUESTS = False
+    return {
+        node: {
+            "runs": len(steps[node]),
+            "wall_ms": summarize_latencies(wall[node]),
+            "step_ms_overlapping": summarize_latencies(steps[node]),
+        }
+        for node in sorted(steps)
+    }
+
+
+async def failed_url_check(client, stub_base_url: str, mode: str) -> dict:
+    """A URL whose scrape fails must give a clean batch error line and must not be cached."""
+    from langgraph_flow.pipeline import pipeline_flights
+
+    url = f"{stub_base_url}/missing/article"
+    # Result caching on for the check, so a cached failure would show up
+    ttl, pipeline_flights.result_ttl = pipeline_flights.result_ttl, max(pipeline_flights.result_ttl, 60.0)
+    try:
+        cached_before = pipeline_flights.stats()["result_cache_size"]
+        response = await client.post("/parse-okr/batch", json={"urls": [url], "mode": mode})
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        cached = pipeline_flights.stats()["result_cache_size"] > cached_before
+    finally:
+        pipeline_flights.result_ttl = ttl
+
+    problems = []
+    line = lines[0] if lines else {}
+    if line.get("status") != "error" or "Failed to fetch" not in str(line.get("error")):
+        problems.append(f"expected the scrape error, got {line or response.text[:200]}")
+    if cached:
+        problems.append("the failed result was cached")
+    return {"ok": not problems, "problems": problems}
+
+
+async def result_writer_check(client) -> dict:
+    """Every compiled result must reach Mongo and the dashboard rollups without errors."""
+    from db.mongo_client import get_results_collection
+    from db.result_writer import result_writer
+
+    deadline = time.monotonic() + 30
+    while result_writer.stats()["pending"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    writer = result_writer.stats()
+    stored = await get_results_collection().count_documents({})
+    response = await client.get("/dashboard/stats")
+    counted = response.json().get("totals", {}).get("count") if response.status_code == 200 else None
+
+    problems = []
+    if writer["pending"]:
+        problems.append(f"{writer['pending']} compiled results still pending after 30s")
+    for field in ("failed", "spilled", "rollup_errors"):
+        if writer[field]:
+            problems.append(f"result_writer {field}: {writer[field]}")
+    if not stored:
+        problems.append("no compiled results were stored")
+    if counted != stored:
+        problems.append(f"/dashboard/stats counts {counted} results, {stored} are stored ({response.text[:200]})")
+    return {"ok": not problems, "problems": problems}
+
+
+async def run_benchmark(args, stub_base_url: str) -> dict:
+    import httpx
+    from main import app
+
+    unique = args.unique_urls or args.requests
+    urls = [f"{stub_base_url}/articles/load-{index % unique}" for index in range(args.requests)]
+    warmup_urls = [f"{stub_base_url}/articles/warmup-{index}" for index in range(args.warmup)]
+    stream_urls = [f"{stub_base_url}/articles/stream-{index}" for index in range(args.stream_samples)]
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not send lifespan events, so run the app's startup/shutdown here
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if warmup_urls:
+                await timed_requests(client, warmup_urls, args.concurrency, args.mode)
+
+            started, cpu_started = time.perf_counter(), time.process_time()
+            results = await timed_requests(client, urls, args.concurrency, args.mode)
+            wall = time.perf_counter() - started
+            # Includes the stub server's threads, which are small next to the app
+            cpu = time.process_time() - cpu_started
+
+            nodes = await node_breakdown(client, stream_urls, args.concurrency, args.mode) if stream_urls else {}
+            checks = {
+                "failed_url": await failed_url_check(client, stub_base_url, args.mode),
+                "result_writer": await result_writer_check(client),
+            }
+            stats = (await client.get("/stats")).json()
+
+    ok = [result for result in results if result["ok"]]
+    errors = defaultdict(int)
+    for result in results:
+        if not result["ok"]:
+            errors[result["error"]] += 1
+
+    return {
+        "config": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "unique_urls": unique,
+            "with_caches": args.with_caches,
+            "respect_rate_limits": args.respect_rate_limits,
+        },
+        "load": {
+            "ok": len(ok),
+            "errors": len(results) - len(ok),
+            "error_breakdown": dict(errors),
+            "wall_seconds": round(wall, 3),
+            "throughput_rps": round(len(results) / wall, 2) if wall else 0.0,
+            "cpu_ms_per_request": round(cpu * 1000 / len(results), 1) if results else 0.0,
+            "latency_ms": summarize_latencies([result["latency_ms"] for result in results]),
+        },
+        "nodes": nodes,
+        "checks": checks,
+        "stats": stats,
+    }
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, REPO_ROOT)
+
+    with tempfile.TemporaryDirectory(prefix="okr-bench-") as tmp:
+        workdir = os.path.abspath(args.workdir or tmp)
+        os.makedirs(workdir, exist_ok=True)
+        configure_environment(args, workdir)
+        output = os.path.abspath(args.output) if args.output else None
+        # The FAISS store lives at a relative path; keep it inside the working directory
+        os.chdir(workdir)
+
+        from bench.stub_server import StubServer
+        stub = StubServer().start()
+        try:
+            install_stand_ins(stub.base_url)
+            # The app logs with print(); keep stdout for the report
+            with contextlib.redirect_stdout(sys.stderr):
+                report = asyncio.run(run_benchmark(args, stub.base_url))
+        finally:
+            stub.stop()
+            os.chdir(REPO_ROOT)
+
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+
+    latency = report["load"]["latency_ms"]
+    print(
+        f"📊 {report['load']['ok']}/{args.requests} ok, {report['load']['throughput_rps']} req/s, "
+        f"p50 {latency['p50']}ms, p95 {latency['p95']}ms, p99 {latency['p99']}ms",
+        file=sys.stderr,
+    )
+    if args.fail_p99_ms is not None and latency["p99"] > args.fail_p99_ms:
+        print(f"❌ p99 {latency['p99']}ms exceeds the {args.fail_p99_ms}ms budget", file=sys.stderr)
+        sys.exit(1)
+    failed_checks = {name: check["problems"] for name, check in report["checks"].items() if not check["ok"]}
+    if failed_checks:
+        print(f"❌ Checks failed: {failed_checks}", file=sys.stderr)
+    if report["load"]["errors"] or failed_checks:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
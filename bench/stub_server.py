@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Simulated upstream latency for article pages and Tavily searches
+BENCH_UPSTREAM_LATENCY_MS = float(os.getenv("BENCH_UPSTREAM_LATENCY_MS", "80"))
+BENCH_TAVILY_LATENCY_MS = float(os.getenv("BENCH_TAVILY_LATENCY_MS", "250"))
+BENCH_ARTICLE_PARAGRAPHS = int(os.getenv("BENCH_ARTICLE_PARAGRAPHS", "40"))
+
+PARAGRAPHS = [
+    "Our goal this quarter is to increase qualified pipeline by {n}% through a focused content program.",
+    "The team will publish {m} long-form articles and measure conversion from each one.",
+    "Retention improved to {n}% after we launched the onboarding series last quarter.",
+    "We track three metrics every week: leads, conversion rate and average deal size.",
+    "Subscribe to our newsletter to get the latest updates.",
+    "A key milestone is reaching {m} enterprise customers before the end of the year.",
+    "Revenue from inbound channels grew {n}% year over year, driven mostly by search.",
+    "We also plan to reduce time to first response to under {m} hours for every new lead.",
+]
+
+
+def article_html(article_id: str) -> str:
+    rng = random.Random(article_id)
+    paragraphs = []
+    for _ in range(BENCH_ARTICLE_PARAGRAPHS):
+        template = rng.choice(PARAGRAPHS)
+        paragraphs.append(f"<p>{template.format(n=rng.randint(5, 60), m=rng.randint(2, 40))}</p>")
+    return (
+        "<html><head>"
+        f"<title>Bench article {article_id}: growing pipeline with content</title>"
+        f'<meta name="description" content="How team {article_id} set measurable content goals for the quarter and tracked them weekly.">'
+        "<style>p { margin: 0 }</style></head><body>"
+        + "\n".join(paragraphs)
+        + "</body></html>"
+    )
+
+
+def tavily_response(query: str) -> dict:
+    rng = random.Random(query)
+    results = [
+        {"title": f"Trend report {index} on {query[:40]}", "url": f"https://example.com/trends/{index}", "score": rng.random()}
+        for index in range(rng.randint(3, 10))
+    ]
+    return {"query": query, "answer": f"Interest in {query[:60]} is steady.", "results": results}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.startswith("/articles/"):
+            self._send(404, b"not found", "text/plain")
+            return
+        time.sleep(BENCH_UPSTREAM_LATENCY_MS / 1000)
+        article_id = self.path[len("/articles/"):].split("?")[0]
+        self._send(200, article_html(article_id).encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        if self.path != "/search":
+            self._send(404, b"not found", "text/plain")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(BENCH_TAVILY_LATENCY_MS / 1000)
+        self._send(200, json.dumps(tavily_response(payload.get("query", ""))).encode("utf-8"), "application/json")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Serves article pages at /articles/<id> and a Tavily-compatible POST /search on localhost."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
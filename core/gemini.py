@@ -0,0 +1,23 @@
+import langchain_google_genai.chat_models as gemini_chat_models
+from langchain_google_genai import ChatGoogleGenerativeAI
+from tenacity import retry, stop_after_attempt
+
+from core.llm_scheduler import llm_scheduler
+
+# langchain-google-genai 0.0.7 wraps each request in its own tenacity retry (10 attempts,
+# up to 60s apart) and ignores max_retries. Those retries would run while holding a
+# scheduler slot, so requests get a single attempt and llm_scheduler.run() retries instead.
+gemini_chat_models._create_retry_decorator = lambda: retry(reraise=True, stop=stop_after_attempt(1))
+
+
+class ScheduledChatModel(ChatGoogleGenerativeAI):
+    """
+    Gemini chat model whose API requests each take an llm_scheduler slot. LangChain only
+    calls _agenerate on a response-cache miss, so cache hits skip the queue and rate limit.
+    """
+
+    max_retries: int = 0
+
+    async def _agenerate(self, *args, **kwargs):
+        async with llm_scheduler.slot(self.model):
+            return await super()._agenerate(*args, **kwargs)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Pool defaults, applied to each upstream host separately
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+# Every host gets its own pool; beyond this many, the least recently used pool is retired
+HTTP_MAX_POOLS = int(os.getenv("HTTP_MAX_POOLS", "100"))
+# How often a retired pool is checked for in-flight requests before it is closed
+HTTP_RETIRE_POLL_INTERVAL = 1.0
+
+# Per-host overrides of the pool defaults.
+# Extend or override with HTTP_HOST_CONFIG, e.g. '{"api.tavily.com": {"max_connections": 5}}'
+HOST_CONFIG: Dict[str, Dict[str, Any]] = {
+    "api.tavily.com": {"max_connections": 10, "max_keepalive": 10, "timeout": 30.0, "http2": True},
+    "www.linkedin.com": {"max_connections": 10, "max_keepalive": 5},
+}
+HOST_CONFIG.update(json.loads(os.getenv("HTTP_HOST_CONFIG", "{}")))
+
+# HTTP/2 needs h2 (installed by httpx[http2]); fall back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_POOL = "default"
+
+
+class HTTPClientRegistry:
+    """
+    Application-scoped httpx clients: one pooled client per upstream host, so a slow
+    article site can only tie up its own connections. Tracks requests and the distinct
+    connections that served them, so keep-alive reuse is visible.
+    """
+
+    def __init__(self, host_config: Optional[Dict[str, Dict[str, Any]]] = None, max_pools: int = HTTP_MAX_POOLS):
+        self.host_config = HOST_CONFIG if host_config is None else host_config
+        self.max_pools = max(1, max_pools)
+        self.retired = 0
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._retiring: Set[asyncio.Task] = set()
+
+    def _pool_settings(self, pool: str) -> Dict[str, Any]:
+        settings = {
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_MAX_KEEPALIVE,
+            "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+            "timeout": HTTP_TIMEOUT,
+            "http2": HTTP_ENABLE_HTTP2,
+        }
+        settings.update(self.host_config.get(pool, {}))
+        settings["http2"] = bool(settings["http2"]) and HTTP2_AVAILABLE
+        return settings
+
+    def _track(self, pool: str):
+        stats = self._stats[pool]
+        # Streams of live connections only: entries drop out as the pool closes them
+        seen = weakref.WeakSet()
+
+        async def on_response(response: httpx.Response):
+            stats["requests"] += 1
+            stream = response.extensions.get("network_stream")
+            if stream is not None and stream not in seen:
+                seen.add(stream)
+                stats["connections_opened"] += 1
+            if response.http_version == "HTTP/2":
+                stats["http2_responses"] += 1
+
+        return on_response
+
+    def _create(self, pool: str) -> httpx.AsyncClient:
+        settings = self._pool_settings(pool)
+        self._stats[pool] = {
+            "settings": settings,
+            "requests": 0,
+            "connections_opened": 0,
+            "http2_responses": 0,
+        }
+        logger.info(f"Creating HTTP pool '{pool}' with {settings}")
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings["max_connections"],
+                max_keepalive_connections=settings["max_keepalive"],
+                keepalive_expiry=settings["keepalive_expiry"],
+            ),
+            timeout=settings["timeout"],
+            http2=settings["http2"],
+            event_hooks={"response": [self._track(pool)]},
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        pool = (urlsplit(url).hostname or "").lower() or DEFAULT_POOL
+        client = self._clients.get(pool)
+        if client is None or client.is_closed:
+            client = self._clients[pool] = self._create(pool)
+        self._clients.move_to_end(pool)
+        while len(self._clients) > self.max_pools:
+            self._retire(*self._clients.popitem(last=False))
+        return client
+
+    def _retire(self, pool: str, client: httpx.AsyncClient):
+        self._stats.pop(pool, None)
+        self.retired += 1
+        task = asyncio.get_running_loop().create_task(self._close_when_idle(pool, client))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    # A retired client may still be streaming a response; close it once nothing is in flight
+    async def _close_when_idle(self, pool: str, client: httpx.AsyncClient):
+        while any(not conn.is_idle() for conn in _connections(client)):
+            await asyncio.sleep(HTTP_RETIRE_POLL_INTERVAL)
+        logger.info(f"Closing retired HTTP pool '{pool}'")
+        await client.aclose()
+
+    async def aclose(self):
+        for task in list(self._retiring):
+            task.cancel()
+        await asyncio.gather(*self._retiring, return_exceptions=True)
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        pools = {}
+        for pool, stats in self._stats.items():
+            connections = _connections(self._clients.get(pool))
+            requests = stats["requests"]
+            pools[pool] = {
+                **stats,
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+                "reused_requests": max(requests - stats["connections_opened"], 0),
+                "reuse_ratio": round(1 - stats["connections_opened"] / requests, 4) if requests else 0.0,
+            }
+        return {"http2_available": HTTP2_AVAILABLE, "retired_pools": self.retired, "pools": pools}
+
+
+def _connections(client: Optional[httpx.AsyncClient]) -> List[Any]:
+    # httpx does not expose its pool publicly; read it defensively
+    return getattr(getattr(getattr(client, "_transport", None), "_pool", None), "connections", [])
+
+
+_registry: Optional[HTTPClientRegistry] = None
+
+
+# Called from the FastAPI lifespan handler
+def start_http_clients() -> HTTPClientRegistry:
+    global _registry
+    if _registry is None:
+        _registry = HTTPClientRegistry()
+    return _registry
+
+
+async def close_http_clients():
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
+
+
+# Outside the app (scripts, benchmarks) the registry is created on first use
+def get_http_client(url: str) -> httpx.AsyncClient:
+    return start_http_clients().get(url)
+
+
+def http_pool_stats() -> Dict[str, Any]:
+    return _registry.stats() if _registry is not None else {"http2_available": HTTP2_AVAILABLE, "pools": {}}
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from db.job_store import JobStore
+
+# Worker pool size and how often idle workers re-check the store
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+
+
+class JobQueue:
+    """
+    Local worker pool over a persistent JobStore. Throughput is bounded by the number
+    of workers, not by how many clients are connected.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: Callable[[str, Optional[str]], Awaitable[Dict[str, Any]]],
+        workers: int = JOB_WORKERS,
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.busy = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        await self._requeue_expired()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Interrupted jobs go straight back to the queue instead of waiting out their lease
+        released = await asyncio.to_thread(self.store.release)
+        if released:
+            print(f"♻️ Returned {released} interrupted jobs to the queue")
+
+    async def _requeue_expired(self):
+        requeued, failed = await asyncio.to_thread(self.store.requeue_expired)
+        if requeued:
+            print(f"♻️ Re-queued {requeued} jobs whose worker stopped renewing its lease")
+            self._wakeup.set()
+        if failed:
+            print(f"❌ Failed {failed} jobs that were interrupted {self.store.max_attempts} times")
+
+    # Keeps this process's leases alive and picks up jobs of processes that died
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self.store.renew_leases)
+                await self._requeue_expired()
+            except Exception as e:
+                print(f"⚠️ Job lease heartbeat failed: {e}")
+
+    async def submit(self, url: str, priority: int = 0, mode: Optional[str] = None) -> Dict[str, Any]:
+        job = await asyncio.to_thread(self.store.create, url, priority, mode)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            self.busy += 1
+            try:
+                result = await self.handler(job["url"], job["mode"])
+                finished = await asyncio.to_thread(self.store.finish, job["id"], result, result.get("error"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                finished = await asyncio.to_thread(self.store.finish, job["id"], None, str(e))
+            finally:
+                self.busy -= 1
+            if not finished:
+                print(f"⚠️ Job {job['id']} outlived its lease and was re-queued; its result was not recorded")
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "jobs": await asyncio.to_thread(self.store.counts),
+        }
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, TypeVar
+
+from core.metrics import LLM_DURATION, LLM_ERRORS, LLM_QUEUE_WAIT, observe
+
+T = TypeVar("T")
+
+# Per-model caps; override or extend with LLM_MODEL_LIMITS, e.g.
+# '{"gemini-2.0-flash": {"concurrency": 8, "rpm": 300}}'
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "4"))
+LLM_DEFAULT_RPM = float(os.getenv("LLM_DEFAULT_RPM", "60"))
+MODEL_LIMITS: Dict[str, Dict[str, float]] = {
+    "gemini-2.0-flash": {"concurrency": 8, "rpm": 120},
+    "gemini-1.5-flash": {"concurrency": 4, "rpm": 60},
+}
+MODEL_LIMITS.update(json.loads(os.getenv("LLM_MODEL_LIMITS", "{}")))
+
+# Retry policy for 429 / quota and 503 errors (the only retries: the client's own are disabled)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "resource has been exhausted" in message
+
+
+def is_unavailable(error: Exception) -> bool:
+    if getattr(error, "code", None) == 503 or getattr(error, "status_code", None) == 503:
+        return True
+    return type(error).__name__ == "ServiceUnavailable" or "503" in str(error)
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; waiters are served in arrival order."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ModelLane:
+    def __init__(self, model: str, concurrency: int, rpm: float):
+        self.model = model
+        self.concurrency = concurrency
+        self.rpm = rpm
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Allow a short burst of up to `concurrency` calls, then hold the per-minute rate
+        self.bucket = TokenBucket(rate=rpm / 60.0, capacity=max(1, concurrency))
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.unavailable = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "rpm": self.rpm,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "unavailable": self.unavailable,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "avg_queue_wait_ms": round(self.total_wait_ms / self.calls, 2) if self.calls else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+class LLMScheduler:
+    """
+    Shared gate for every Gemini call: per-model concurrency cap, token-bucket rate limit,
+    and jittered exponential backoff on 429s and 503s. run() owns the retries; slot() is
+    taken by the model itself for each API request, so response-cache hits never queue.
+    Queueing delay is recorded per model.
+    """
+
+    def __init__(self):
+        self._lanes: Dict[str, ModelLane] = {}
+
+    def lane(self, model: str) -> ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = MODEL_LIMITS.get(model, {})
+            lane = self._lanes[model] = ModelLane(
+                model,
+                concurrency=int(limits.get("concurrency", LLM_DEFAULT_CONCURRENCY)),
+                rpm=float(limits.get("rpm", LLM_DEFAULT_RPM)),
+            )
+        return lane
+
+    @asynccontextmanager
+    async def slot(self, model: str) -> AsyncIterator[None]:
+        """Holds one concurrency slot and one rate token of `model` for a single API request."""
+        lane = self.lane(model)
+        queued = time.perf_counter()
+        lane.waiting += 1
+        try:
+            await lane.semaphore.acquire()
+        finally:
+            lane.waiting -= 1
+        try:
+            await lane.bucket.acquire()
+            wait_ms = (time.perf_counter() - queued) * 1000
+            lane.calls += 1
+            lane.total_wait_ms += wait_ms
+            lane.max_wait_ms = max(lane.max_wait_ms, wait_ms)
+            LLM_QUEUE_WAIT.observe(wait_ms / 1000, model=model)
+            lane.in_flight += 1
+            try:
+                with observe(LLM_DURATION, LLM_ERRORS, f"llm:{model}", model=model):
+                    yield
+            finally:
+                lane.in_flight -= 1
+        finally:
+            lane.semaphore.release()
+
+    async def run(self, model: str, call: Callable[[], Awaitable[T]]) -> T:
+        lane = self.lane(model)
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                return await call()
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                if not (rate_limited or is_unavailable(e)) or attempt == LLM_MAX_RETRIES:
+                    lane.errors += 1
+                    raise
+                if rate_limited:
+                    lane.rate_limited += 1
+                else:
+                    lane.unavailable += 1
+                reason = "rate limited" if rate_limited else "unavailable"
+
+            # The slot was released when the request failed, so other calls use it meanwhile
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"⏳ {model} {reason}, retrying in {delay:.1f}s (attempt {attempt + 1}/{LLM_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: lane.stats() for model, lane in self._lanes.items()}
+
+
+llm_scheduler = LLMScheduler()
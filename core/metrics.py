@@ -0,0 +1,306 @@
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from core.tracing import span
+
+# Latency buckets in seconds, from sub-millisecond cache reads to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Token counts are estimated from text length when the provider reports no usage
+CHARS_PER_TOKEN = 4
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yields (name suffix, rendered labels, value) for every exposed series."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", _format_labels(self.labelnames, key), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"'), cumulative
+            yield "_sum", _format_labels(self.labelnames, key), total
+            yield "_count", _format_labels(self.labelnames, key), cumulative
+
+
+class MetricsRegistry:
+    """
+    Process-wide metric registry rendered in the Prometheus text format. Collectors are
+    called at scrape time to refresh gauges derived from the subsystems' own stats().
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Graph nodes
+NODE_DURATION = registry.histogram("okr_node_duration_seconds", "LangGraph node execution time", ["node"])
+NODE_ERRORS = registry.counter("okr_node_errors_total", "LangGraph node executions that raised", ["node"])
+
+# LLM calls (timed inside the scheduler, so queueing is reported separately)
+LLM_DURATION = registry.histogram("okr_llm_call_duration_seconds", "LLM API request time, excluding queueing and cache hits", ["model"])
+LLM_QUEUE_WAIT = registry.histogram("okr_llm_queue_wait_seconds", "Time spent waiting for an LLM scheduler slot", ["model"])
+LLM_ERRORS = registry.counter("okr_llm_errors_total", "LLM calls that raised, including rate-limited attempts", ["model"])
+LLM_TOKENS = registry.counter("okr_llm_tokens_total", "LLM tokens by direction (estimated when not reported)", ["model", "direction"])
+
+# Embeddings (only calls that miss the local embedding cache reach the model)
+EMBEDDING_DURATION = registry.histogram("okr_embedding_call_duration_seconds", "Embedding model call time", ["model"])
+EMBEDDING_ERRORS = registry.counter("okr_embedding_errors_total", "Embedding model calls that raised", ["model"])
+EMBEDDING_TEXTS = registry.counter("okr_embedding_texts_total", "Texts sent to the embedding model", ["model"])
+
+# Upstream HTTP calls
+HTTP_DURATION = registry.histogram("okr_upstream_request_duration_seconds", "Upstream HTTP request time", ["upstream"])
+HTTP_ERRORS = registry.counter("okr_upstream_errors_total", "Failed upstream HTTP requests", ["upstream"])
+
+# Mongo writes
+MONGO_WRITE_DURATION = registry.histogram("okr_mongo_write_duration_seconds", "Mongo write time", ["operation"])
+MONGO_WRITE_ERRORS = registry.counter("okr_mongo_write_errors_total", "Failed Mongo writes", ["operation"])
+MONGO_DOCUMENTS_WRITTEN = registry.counter("okr_mongo_documents_written_total", "Compiled results inserted into Mongo")
+
+# Cache effectiveness, refreshed from the caches' stats() on every scrape
+CACHE_HIT_RATIO = registry.gauge("okr_cache_hit_ratio", "Hit ratio since process start", ["cache"])
+CACHE_LOOKUPS = registry.gauge("okr_cache_lookups", "Lookups since process start", ["cache", "result"])
+
+# HTTP API
+REQUEST_DURATION = registry.histogram("okr_http_request_duration_seconds", "API request time", ["method", "route", "status"])
+
+
+class Observation:
+    """Handle yielded by observe(); failed() marks an outcome that was handled without raising."""
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.error = False
+
+    def failed(self, reason: Optional[str] = None):
+        self.error = True
+        self.record["status"] = "error"
+        if reason:
+            self.record["error"] = reason
+
+
+@contextmanager
+def observe(histogram: Histogram, errors: Counter, span_name: str, **labels: Any):
+    """Times the block into `histogram`, counts failures in `errors`, and records a trace span."""
+    started = time.perf_counter()
+    with span(span_name, **labels) as record:
+        observation = Observation(record)
+        try:
+            yield observation
+        except BaseException:
+            observation.error = True
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started, **labels)
+            if observation.error:
+                errors.inc(**labels)
+
+
+def instrument_node(name: str, node: Callable[[dict], Any]) -> Callable[[dict], Any]:
+    """Wraps an async graph node so each execution is timed, counted and traced."""
+
+    @wraps(node)
+    async def instrumented(state: dict):
+        with observe(NODE_DURATION, NODE_ERRORS, f"node:{name}", node=name):
+            return await node(state)
+
+    return instrumented
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class LLMTokenCounter(AsyncCallbackHandler):
+    """
+    Chat model callback that counts prompt and completion tokens per model. Uses the
+    provider's usage metadata when present, otherwise estimates from text length.
+    Responses served from the LLM cache spent no tokens and are skipped.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._prompt_tokens: Dict[Any, int] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._prompt_tokens[run_id] = sum(
+            estimate_tokens(str(message.content)) for batch in messages for message in batch
+        )
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        estimated_prompt = self._prompt_tokens.pop(run_id, 0)
+        generations = [generation for batch in response.generations for generation in batch]
+        if generations and all((generation.generation_info or {}).get("cached") for generation in generations):
+            return
+        usage = (response.llm_output or {}).get("usage_metadata") or (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_token_count") or usage.get("prompt_tokens") or estimated_prompt
+        completion_tokens = usage.get("candidates_token_count") or usage.get("completion_tokens") or sum(
+            estimate_tokens(generation.text) for generations in response.generations for generation in generations
+        )
+        LLM_TOKENS.inc(prompt_tokens, model=self.model, direction="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=self.model, direction="completion")
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._prompt_tokens.pop(run_id, None)
+
+
+_token_counters: Dict[str, LLMTokenCounter] = {}
+
+
+def llm_callbacks(model: str) -> List[LLMTokenCounter]:
+    """Callbacks to pass as `callbacks=` to a chat model for token accounting."""
+    if model not in _token_counters:
+        _token_counters[model] = LLMTokenCounter(model)
+    return [_token_counters[model]]
+
+
+def record_cache_stats(cache: str, stats: Dict[str, Any], hits: Sequence[str] = ("hits",), misses: Sequence[str] = ("misses",)):
+    hit_count = sum(stats.get(key, 0) for key in hits)
+    miss_count = sum(stats.get(key, 0) for key in misses)
+    CACHE_LOOKUPS.set(hit_count, cache=cache, result="hit")
+    CACHE_LOOKUPS.set(miss_count, cache=cache, result="miss")
+    total = hit_count + miss_count
+    CACHE_HIT_RATIO.set(hit_count / total if total else 0.0, cache=cache)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that never change the article a URL points to
+TRACKING_PARAMS = {"trk", "trackingid", "fbclid", "gclid", "li_fat_id", "ref", "refid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form used as the coalescing key: lowercase scheme and host, no default port,
+    no fragment, no trailing slash, tracking parameters dropped and the rest sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one shared execution and keeps
+    completed results for `result_ttl` seconds. The shared task is shielded, so a
+    cancelled caller does not cancel the run for everyone else.
+    """
+
+    def __init__(self, result_ttl: float = 60.0, max_results: int = 1024):
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, Any] = {}
+        self.runs = 0
+        self.absorbed_requests = 0
+        self.max_absorbed = 0
+        self.absorbed_histogram = {"0": 0, "1": 0, "2-4": 0, "5-9": 0, "10+": 0}
+        self.result_cache_hits = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        cached = self._results.get(key)
+        if cached is not None:
+            expires_at, result = cached
+            if expires_at > time.monotonic():
+                self.result_cache_hits += 1
+                return result
+            self._results.pop(key, None)
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            flight["absorbed"] += 1
+            self.absorbed_requests += 1
+            return await asyncio.shield(flight["task"])
+
+        self.runs += 1
+        flight = {"task": asyncio.ensure_future(fn()), "absorbed": 0, "cache_if": cache_if}
+        self._inflight[key] = flight
+        flight["task"].add_done_callback(lambda task: self._finish(key, flight, task))
+        return await asyncio.shield(flight["task"])
+
+    def _finish(self, key: str, flight: Dict[str, Any], task: asyncio.Future):
+        self._inflight.pop(key, None)
+
+        absorbed = flight["absorbed"]
+        self.max_absorbed = max(self.max_absorbed, absorbed)
+        if absorbed == 0:
+            bucket = "0"
+        elif absorbed == 1:
+            bucket = "1"
+        elif absorbed < 5:
+            bucket = "2-4"
+        elif absorbed < 10:
+            bucket = "5-9"
+        else:
+            bucket = "10+"
+        self.absorbed_histogram[bucket] += 1
+
+        if task.cancelled() or task.exception() is not None or self.result_ttl <= 0:
+            return
+        result = task.result()
+        if flight["cache_if"] is not None and not flight["cache_if"](result):
+            return
+        self._results[key] = (time.monotonic() + self.result_ttl, result)
+        while len(self._results) > self.max_results:
+            self._results.pop(next(iter(self._results)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "in_flight": len(self._inflight),
+            "absorbed_requests": self.absorbed_requests,
+            "max_absorbed_per_run": self.max_absorbed,
+            "absorbed_per_run": dict(self.absorbed_histogram),
+            "result_cache_hits": self.result_cache_hits,
+            "result_cache_size": len(self._results),
+            "result_ttl_seconds": self.result_ttl,
+        }
@@ -0,0 +1,91 @@
+import contextvars
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Per-request span recording is opt-in; request ids are always assigned
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "false").lower() == "true"
+TRACE_MAX_REQUESTS = int(os.getenv("TRACE_MAX_REQUESTS", "500"))
+
+current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans recorded while serving one request, with offsets relative to its start."""
+
+    def __init__(self, request_id: str, name: str):
+        self.request_id = request_id
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+
+    def offset_ms(self, moment: float) -> float:
+        return round((moment - self.started) * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+
+# Most recent finished traces, oldest evicted first
+_traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_trace(request_id: str, name: str) -> Optional[Trace]:
+    current_request_id.set(request_id)
+    if not TRACE_REQUESTS:
+        return None
+    trace = Trace(request_id, name)
+    current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: Optional[Trace]):
+    if trace is None:
+        return
+    trace.duration_ms = trace.offset_ms(time.perf_counter())
+    _traces[trace.request_id] = trace
+    _traces.move_to_end(trace.request_id)
+    while len(_traces) > TRACE_MAX_REQUESTS:
+        _traces.popitem(last=False)
+
+
+def get_trace(request_id: str) -> Optional[Dict[str, Any]]:
+    trace = _traces.get(request_id)
+    return trace.to_dict() if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Records a span on the current request's trace, if one is being recorded. Yields a dict
+    the caller can add attributes to; an exception marks the span as an error.
+    """
+    trace = current_trace.get()
+    record: Dict[str, Any] = {"name": name, **attributes, "status": "ok"}
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "error"
+        raise
+    finally:
+        if trace is not None:
+            record["start_ms"] = trace.offset_ms(started)
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            trace.spans.append(record)
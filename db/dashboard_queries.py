@@ -0,0 +1,87 @@
+import base64
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId
+
+# Fields returned by the list view; "full" returns whole documents
+SUMMARY_PROJECTION = {
+    "timestamp": 1,
+    "input_url": 1,
+    "objective": 1,
+    "metadata.title": 1,
+    "trend_score": 1,
+    "content_exists": 1,
+    "scores": 1,
+    "compiled_result.ai_scores": 1,
+}
+
+# Newest first; _id breaks ties between equal timestamps
+RESULTS_SORT = [("timestamp", -1), ("_id", -1)]
+
+# Range-filterable score fields: query parameter prefix -> document field
+SCORE_FIELDS = {
+    "relevance": "scores.relevance",
+    "credibility": "scores.credibility",
+    "completeness": "scores.completeness",
+    "trend_score": "trend_score",
+}
+
+
+def json_default(value: Any) -> str:
+    """json.dumps fallback: ISO 8601 timestamps (the format since/until accept), str() otherwise."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    raw = f"{document['timestamp'].isoformat()}|{document['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, object_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def build_results_query(
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    score_ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+) -> Dict[str, Any]:
+    clauses = []
+
+    if cursor:
+        timestamp, object_id = decode_cursor(cursor)
+        clauses.append({"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": object_id}},
+        ]})
+
+    date_range = {}
+    if since is not None:
+        date_range["$gte"] = since
+    if until is not None:
+        date_range["$lt"] = until
+    if date_range:
+        clauses.append({"timestamp": date_range})
+
+    for name, (low, high) in (score_ranges or {}).items():
+        score_range = {}
+        if low is not None:
+            score_range["$gte"] = low
+        if high is not None:
+            score_range["$lte"] = high
+        if score_range:
+            clauses.append({SCORE_FIELDS[name]: score_range})
+
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
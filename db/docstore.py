@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+from db.faiss_index import lock_store
+
+# Durability/throughput trade-off: commit every N adds. The duplicate store's flusher commits
+# before each index write, and adds newer than the saved index are dropped on load anyway,
+# so batching loses nothing. SQLite's synchronous level decides when to fsync.
+DOCSTORE_COMMIT_EVERY = int(os.getenv("DOCSTORE_COMMIT_EVERY", "100"))
+DOCSTORE_SYNCHRONOUS = os.getenv("DOCSTORE_SYNCHRONOUS", "NORMAL").upper()
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+# What the scraper reports for a page without a <title>; such pages share no identity
+PLACEHOLDER_TITLES = {"unknown"}
+
+
+def normalize_title(title) -> str:
+    """Lowercased, whitespace-collapsed title, or "" when the page has no real title."""
+    normalized = " ".join(str(title or "").lower().split())
+    return "" if normalized in PLACEHOLDER_TITLES else normalized
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Append-only SQLite docstore for the duplicate store. Rows are keyed by FAISS vector
+    position, so each add is one insert and lookups by FAISS id or docstore id are
+    indexed. Also serves the normalized-title index used for exact duplicate checks.
+    Positions are handed out from next_position, read once at open, so only one process
+    may add to a docstore: the holder of the store's lock_store() lock.
+    """
+
+    def __init__(self, path: str, commit_every: int = DOCSTORE_COMMIT_EVERY, synchronous: str = DOCSTORE_SYNCHRONOUS):
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            print(f"⚠️ Unknown DOCSTORE_SYNCHRONOUS '{synchronous}', using NORMAL")
+            synchronous = "NORMAL"
+        self.path = path
+        self.commit_every = max(1, commit_every)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, normalized_title TEXT, "
+            "page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_title ON documents(normalized_title)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(position) FROM documents").fetchone()
+        # Next FAISS position; FAISS appends vectors in the same order documents are added
+        self.next_position = 0 if row[0] is None else row[0] + 1
+
+    @staticmethod
+    def _document(row: Tuple[str, str]) -> Document:
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM documents WHERE doc_id = ?", (search,)
+            ).fetchone()
+        return self._document(row) if row is not None else f"ID {search} not found."
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = []
+        for position, (doc_id, doc) in enumerate(texts.items(), start=self.next_position):
+            metadata = doc.metadata or {}
+            title = metadata.get("normalized_title") or normalize_title(metadata.get("title", ""))
+            rows.append((position, doc_id, title, doc.page_content, json.dumps(metadata, default=str)))
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO documents (position, doc_id, normalized_title, page_content, metadata) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                self._uncommitted = 0
+                raise ValueError(f"Tried to add ids that already exist: {e}")
+            self.next_position += len(rows)
+            self._uncommitted += len(rows)
+            if self._uncommitted >= self.commit_every:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def delete(self, ids: List) -> None:
+        # Rows are addressed by FAISS vector position, which a delete would shift
+        raise ValueError("SQLiteDocstore is append-only; rebuild the store to remove documents")
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def positions(self) -> "PositionMap":
+        """FAISS position -> docstore id mapping that reads rows on demand instead of loading them all."""
+        return PositionMap(self)
+
+    def doc_id_at(self, position: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT doc_id FROM documents WHERE position = ?", (int(position),)).fetchone()
+        return row[0] if row is not None else None
+
+    def has_title(self, normalized_title: str) -> bool:
+        # Same connection as add(), so uncommitted adds are seen too
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM documents WHERE normalized_title = ? LIMIT 1", (normalized_title,)
+            ).fetchone() is not None
+
+    def title_index(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT normalized_title, doc_id FROM documents WHERE normalized_title IS NOT NULL AND normalized_title != '' "
+                "ORDER BY position"
+            ))
+
+    def truncate(self, count: int) -> int:
+        """Drop documents at positions >= count (e.g. adds whose vectors were never saved)."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM documents WHERE position >= ?", (count,)).rowcount
+            self._conn.commit()
+            self._uncommitted = 0
+            self.next_position = min(self.next_position, count)
+            return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+class PositionMap(MutableMapping):
+    """
+    index_to_docstore_id for LangChain's FAISS store, served from the docstore so opening a
+    store doesn't read every row. add() already records each document's position, so
+    writes from FAISS.add_embeddings only advance the length it numbers new vectors from.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+        self._length = docstore.next_position
+
+    def __getitem__(self, position: int) -> str:
+        doc_id = self.docstore.doc_id_at(position)
+        if doc_id is None:
+            raise KeyError(position)
+        return doc_id
+
+    def __setitem__(self, position: int, doc_id: str):
+        self._length = max(self._length, int(position) + 1)
+
+    def __delitem__(self, position: int):
+        raise ValueError("SQLiteDocstore is append-only; rebuild the store to remove documents")
+
+    def __iter__(self) -> Iterator[int]:
+        with self.docstore._lock:
+            positions = [row[0] for row in self.docstore._conn.execute("SELECT position FROM documents ORDER BY position")]
+        return iter(positions)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def import_pickle(pickle_path: str, docstore: SQLiteDocstore) -> int:
+    """
+    One-shot import of a LangChain FAISS.save_local pickle (docstore, index_to_docstore_id).
+    Only run this on a pickle this deployment wrote itself: unpickling executes code.
+    """
+    with open(pickle_path, "rb") as f:
+        legacy_docstore, index_to_docstore_id = pickle.load(f)
+
+    documents = {}
+    for position in sorted(index_to_docstore_id):
+        if position != docstore.next_position + len(documents):
+            raise ValueError(f"Pickled docstore has a gap at FAISS position {position}")
+        doc_id = index_to_docstore_id[position]
+        doc = legacy_docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            raise ValueError(f"Pickled docstore is missing document {doc_id}")
+        documents[doc_id] = doc
+    docstore.add(documents)
+    docstore.commit()
+    return len(documents)
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.docstore import [--folder rag_store/faiss_index]
+    parser = argparse.ArgumentParser(prog="python -m db.docstore")
+    parser.add_argument("command", choices=["import"])
+    parser.add_argument("--folder", default=os.path.join("rag_store", "faiss_index"))
+    args = parser.parse_args()
+
+    pickle_path = os.path.join(args.folder, "index.pkl")
+    if not os.path.exists(pickle_path):
+        print(f"❌ No pickled docstore at {pickle_path}")
+        sys.exit(1)
+    try:
+        lock = lock_store(args.folder)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    store = SQLiteDocstore(os.path.join(args.folder, "docstore.sqlite"))
+    if store.count():
+        print(f"❌ {store.path} already holds {store.count()} documents; remove it to re-import")
+        sys.exit(1)
+    imported = import_pickle(pickle_path, store)
+    store.close()
+    os.replace(pickle_path, pickle_path + ".imported")
+    lock.close()
+    print(f"✅ Imported {imported} documents into {store.path}")
@@ -0,0 +1,208 @@
+import argparse
+import math
+import os
+import socket
+import sys
+import time
+from typing import IO, Tuple
+
+import faiss
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; keeping to one writer is then up to the operator
+    fcntl = None
+
+# Index type for new stores: "flat" (exact), "hnsw" (graph ANN) or "ivf" (clustered ANN,
+# trained once the store holds FAISS_IVF_TRAIN_THRESHOLD vectors; flat until then)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+# Memory-map the index file on load, so startup doesn't read the whole index (the first
+# add copies it into memory). Only one process may open a store; see lock_store.
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+FAISS_IVF_TRAIN_THRESHOLD = int(os.getenv("FAISS_IVF_TRAIN_THRESHOLD", "10000"))
+# 0 picks ~4*sqrt(n) lists, capped so each list gets enough training points
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))
+FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+
+# faiss wants roughly this many training points per inverted list
+IVF_MIN_POINTS_PER_LIST = 39
+
+
+def index_type(index: faiss.Index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def configure_search(index: faiss.Index) -> faiss.Index:
+    kind = index_type(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+    elif kind == "ivf":
+        index.nprobe = FAISS_IVF_NPROBE
+    return index
+
+
+def create_index(dimension: int, kind: str = FAISS_INDEX_TYPE) -> faiss.Index:
+    """Empty L2 index of the configured type; IVF starts flat because it needs training data."""
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{kind}', expected one of {INDEX_TYPES}")
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, FAISS_HNSW_M)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        return configure_search(index)
+    return faiss.IndexFlatL2(dimension)
+
+
+def all_vectors(index: faiss.Index) -> np.ndarray:
+    """Every stored vector, in id order."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def ivf_nlist(count: int) -> int:
+    nlist = FAISS_IVF_NLIST or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // IVF_MIN_POINTS_PER_LIST))
+
+
+def build_index(vectors: np.ndarray, kind: str) -> faiss.Index:
+    """Index of the given type holding `vectors` with ids 0..n-1, so docstore mappings carry over."""
+    dimension = vectors.shape[1]
+    if kind == "ivf" and len(vectors) >= IVF_MIN_POINTS_PER_LIST:
+        nlist = ivf_nlist(len(vectors))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dimension), dimension, nlist)
+        index.train(vectors)
+    else:
+        index = create_index(dimension, kind)
+    index.add(vectors)
+    return configure_search(index)
+
+
+def should_train_ivf(index: faiss.Index, kind: str = FAISS_INDEX_TYPE) -> bool:
+    return kind == "ivf" and index_type(index) == "flat" and index.ntotal >= FAISS_IVF_TRAIN_THRESHOLD
+
+
+def train_ivf(index: faiss.Index) -> faiss.Index:
+    started = time.perf_counter()
+    trained = build_index(all_vectors(index), "ivf")
+    print(
+        f"🧠 Trained IVF index ({trained.nlist} lists) on {trained.ntotal} vectors "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return trained
+
+
+def read_index(path: str, mmap: bool = FAISS_MMAP) -> Tuple[faiss.Index, bool]:
+    """Returns (index, mapped). A mapped index is read-only: materialize() it before adding."""
+    if mmap and hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        try:
+            return configure_search(faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)), True
+        except RuntimeError as e:
+            print(f"⚠️ Memory-mapped FAISS load failed, reading into memory: {e}")
+    return configure_search(faiss.read_index(path)), False
+
+
+def materialize(index: faiss.Index) -> faiss.Index:
+    """Copy of a memory-mapped index that owns its data and accepts adds."""
+    return configure_search(faiss.deserialize_index(faiss.serialize_index(index)))
+
+
+def write_index(index: faiss.Index, path: str):
+    # Write beside the target and swap it in: truncating a file that is memory-mapped
+    # (by the app, until its first add) would invalidate the mapping
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def snapshot(index: faiss.Index) -> np.ndarray:
+    """In-memory copy of the index file contents, so the disk write can happen without the index."""
+    return faiss.serialize_index(index)
+
+
+def write_snapshot(data: np.ndarray, path: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data.tobytes())
+    os.replace(tmp_path, path)
+
+
+def lock_store(folder: str) -> IO:
+    """
+    Take the single-writer lock of the duplicate store in `folder`. Positions in the docstore
+    and the index file both assume one writer, so only the process holding this lock may load
+    the store for adds, flush it or replace it. The lock is held until the returned file is
+    closed or the process exits; raises RuntimeError if another process holds it.
+    """
+    # Beside the folder, so it outlives the folder being moved aside or swapped
+    path = folder.rstrip(os.sep) + ".lock"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a+")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.seek(0)
+        owner = handle.read().strip() or "unknown"
+        handle.close()
+        raise RuntimeError(
+            f"The duplicate store in {folder} is in use by another process ({owner}). It allows a "
+            "single writer: run one app worker per store and stop it before maintenance commands"
+        )
+    handle.seek(0)
+    handle.truncate()
+    handle.write(f"{socket.gethostname()}:{os.getpid()}\n")
+    handle.flush()
+    return handle
+
+
+def migrate(folder: str, kind: str):
+    """Rebuild the index file in `folder` as `kind`; the docstore is unchanged since ids are kept."""
+    path = os.path.join(folder, "index.faiss")
+    if not os.path.exists(path):
+        print(f"❌ No FAISS index at {path}")
+        sys.exit(1)
+
+    try:
+        lock = lock_store(folder)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    index, _ = read_index(path, mmap=False)
+    current = index_type(index)
+    print(f"📂 Loaded {current} index with {index.ntotal} vectors from {path}")
+
+    started = time.perf_counter()
+    rebuilt = build_index(all_vectors(index), kind)
+    if kind == "ivf" and index_type(rebuilt) != "ivf":
+        print(f"⚠️ Too few vectors to train IVF, keeping a flat index until {FAISS_IVF_TRAIN_THRESHOLD}")
+    write_index(rebuilt, path)
+    print(
+        f"✅ Migrated {current} -> {index_type(rebuilt)} ({rebuilt.ntotal} vectors) "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    lock.close()
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.faiss_index migrate [flat|hnsw|ivf] [--folder rag_store/faiss_index]
+    # Stop the app first; it holds the store's writer lock while running.
+    parser = argparse.ArgumentParser(prog="python -m db.faiss_index")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("index_type", nargs="?", default=FAISS_INDEX_TYPE, choices=INDEX_TYPES)
+    parser.add_argument("--folder", default=os.path.join("rag_store", "faiss_index"))
+    args = parser.parse_args()
+    migrate(args.folder, args.index_type)
@@ -0,0 +1,173 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+# Durable queue location (survives restarts, unlike the caches)
+DATA_DIR = os.getenv("DATA_DIR", "data")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(DATA_DIR, "jobs.sqlite"))
+# A job whose run was interrupted this many times (e.g. it keeps crashing the worker) is failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job belongs to the process that claimed it until its lease lapses; the owner
+# renews it while the job runs, so only jobs of a dead process are ever re-queued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+
+class JobStore:
+    """
+    SQLite-backed job table. Jobs move queued -> running -> done | failed; higher
+    priority first, then FIFO. Several processes may share the table: a claim is atomic
+    and leases the job to this store's owner id. A running job whose lease has expired
+    (its process died) is re-queued, unless it has already been claimed max_attempts times.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, max_attempts: int = JOB_MAX_ATTEMPTS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, url TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, mode TEXT, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            # Columns added after the first release; NULL mode means the default pipeline,
+            # a NULL lease on a running job means it was claimed before leases existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("mode", "TEXT"), ("owner", "TEXT"), ("lease_expires", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, url: str, priority: int = 0, mode: Optional[str] = None) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT INTO jobs (id, url, priority, mode, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, url, priority, mode, time.time()),
+            )
+            conn.commit()
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._db()
+            now = time.time()
+            # The write lock is taken before the SELECT, so no other process can claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                claimed = row is not None and conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, owner = ?, "
+                    "lease_expires = ? WHERE id = ? AND status = 'queued'",
+                    (now, self.owner, now + self.lease_seconds, row["id"]),
+                ).rowcount == 1
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        if not claimed:
+            return None
+        job = self._to_dict(row)
+        job["status"] = "running"
+        job["attempts"] += 1
+        job["owner"] = self.owner
+        return job
+
+    def renew_leases(self) -> int:
+        """Extends the lease of every job this owner is running; returns how many."""
+        with self._lock:
+            conn = self._db()
+            renewed = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE status = 'running' AND owner = ?",
+                (time.time() + self.lease_seconds, self.owner),
+            ).rowcount
+            conn.commit()
+        return renewed
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        """Records the outcome; False if the job is no longer ours (its lease lapsed and it was re-queued)."""
+        with self._lock:
+            conn = self._db()
+            finished = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND status = 'running' AND owner = ?",
+                (
+                    "failed" if error else "done",
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    self.owner,
+                ),
+            ).rowcount
+            conn.commit()
+        return finished == 1
+
+    def release(self) -> int:
+        """Hands this owner's running jobs back to the queue on a clean shutdown, without using up an attempt."""
+        with self._lock:
+            conn = self._db()
+            released = conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), started_at = NULL, "
+                "owner = NULL, lease_expires = NULL WHERE status = 'running' AND owner = ?",
+                (self.owner,),
+            ).rowcount
+            conn.commit()
+        return released
+
+    def requeue_expired(self) -> Tuple[int, int]:
+        """Returns (re-queued, failed) counts for running jobs whose owner stopped renewing the lease."""
+        expired = "status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)"
+        with self._lock:
+            conn = self._db()
+            now = time.time()
+            failed = conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, owner = NULL, lease_expires = NULL "
+                f"WHERE {expired} AND attempts >= ?",
+                (f"Interrupted on each of {self.max_attempts} attempts", now, now, self.max_attempts),
+            ).rowcount
+            requeued = conn.execute(
+                f"UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, lease_expires = NULL "
+                f"WHERE {expired}",
+                (now,),
+            ).rowcount
+            conn.commit()
+        return requeued, failed
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+# Local cache location, expiry and size bound
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_responses.sqlite"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Default mode for every chain; override per chain with LLM_CACHE_MODE_<CHAIN_NAME>
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+CACHE_MODES = ("on", "off", "read-only")
+
+
+class SQLiteResponseStore:
+    """
+    Shared SQLite backend for cached LLM responses, with TTL expiry and oldest-first
+    eviction once the entry count passes max_entries.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._count = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key BLOB PRIMARY KEY, chain TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)")
+            self._count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._count -= 1
+                return None
+            return row[0]
+
+    def set(self, key: bytes, chain: str, response: str):
+        with self._lock:
+            conn = self._db()
+            before = conn.total_changes
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chain, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, chain, response, time.time()),
+            )
+            # INSERT OR REPLACE counts a delete plus an insert when the key already existed
+            if conn.total_changes - before == 1:
+                self._count += 1
+            if self._count > self.max_entries:
+                expired = conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+                self._count -= expired
+                overflow = self._count - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY created_at LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._count -= overflow
+                self.evictions += expired + max(overflow, 0)
+            conn.commit()
+
+    def clear(self, chain: Optional[str] = None):
+        with self._lock:
+            conn = self._db()
+            if chain is None:
+                conn.execute("DELETE FROM responses")
+            else:
+                conn.execute("DELETE FROM responses WHERE chain = ?", (chain,))
+            conn.commit()
+            self._count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ChainResponseCache(BaseCache):
+    """
+    Per-chain view over the shared store. Keys are sha256(llm_string + prompt), where
+    llm_string carries the model name and generation params and prompt is the rendered input.
+    """
+
+    def __init__(self, store: SQLiteResponseStore, chain: str, mode: str = "on"):
+        self.store = store
+        self.chain = chain
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> bytes:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).digest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        raw = self.store.get(self._key(prompt, llm_string))
+        if raw is None:
+            self.misses += 1
+            return None
+        try:
+            generations = loads(raw)
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cached response for {self.chain}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Lets callbacks (token accounting) tell a cache hit from a provider response
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cached": True}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode == "read-only":
+            return
+        self.store.set(self._key(prompt, llm_string), self.chain, dumps(list(return_val)))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear(chain=self.chain)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+response_store = SQLiteResponseStore()
+_chain_caches: Dict[str, Union[ChainResponseCache, str]] = {}
+
+
+def get_llm_cache(chain: str) -> Union[ChainResponseCache, bool]:
+    """
+    Returns the cache to pass as `cache=` to a chat model for the named chain,
+    or False when caching is turned off for it.
+    """
+    mode = os.getenv(f"LLM_CACHE_MODE_{chain.upper()}", LLM_CACHE_MODE).lower()
+    if mode not in CACHE_MODES:
+        print(f"⚠️ Unknown LLM cache mode '{mode}' for {chain}, using 'on'")
+        mode = "on"
+    if mode == "off":
+        _chain_caches[chain] = "off"
+        return False
+    cache = ChainResponseCache(response_store, chain, mode)
+    _chain_caches[chain] = cache
+    return cache
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    chains = {
+        name: cache.stats() if isinstance(cache, ChainResponseCache) else {"mode": cache}
+        for name, cache in _chain_caches.items()
+    }
+    return {
+        "entries": response_store._count,
+        "max_entries": response_store.max_entries,
+        "ttl_seconds": response_store.ttl,
+        "evictions": response_store.evictions,
+        "chains": chains,
+    }
@@ -1,5 +1,50 @@
+import os
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 
-client = AsyncIOMotorClient("mongodb://localhost:27017")
-db = client["okr_database"]
-results_collection = db["compiled_results"]
+# Connection settings; one pooled client is shared by the whole process
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "okr_database")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+
+client: Optional[AsyncIOMotorClient] = None
+
+# Created by the FastAPI lifespan handler, or on first use outside the app
+def get_client() -> AsyncIOMotorClient:
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+        )
+    return client
+
+def get_db():
+    return get_client()[MONGO_DB_NAME]
+
+def get_results_collection():
+    return get_db()["compiled_results"]
+
+# Indexes for duplicate lookups and the paginated dashboard
+async def ensure_indexes():
+    results_collection = get_results_collection()
+    await results_collection.create_index("input_url")
+    await results_collection.create_index("normalized_title")
+    await results_collection.create_index([("timestamp", -1), ("_id", -1)])
+    for field in ("scores.relevance", "scores.credibility", "scores.completeness", "trend_score"):
+        await results_collection.create_index([(field, 1), ("timestamp", -1)])
+
+async def init_mongo():
+    get_client()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ Failed to create MongoDB indexes: {e}")
+
+def close_mongo():
+    global client
+    if client is not None:
+        client.close()
+        client = None
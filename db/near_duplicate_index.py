@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Articles whose 64-bit SimHash signatures differ in at most this many bits are near-duplicates
+NEAR_DUP_MAX_HAMMING = int(os.getenv("NEAR_DUP_MAX_HAMMING", "3"))
+# Below this many words the signature is too noisy to trust, so no signature is taken
+NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", "50"))
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", os.path.join("rag_store", "near_duplicates.sqlite"))
+
+SIGNATURE_BITS = 64
+SHINGLE_SIZE = 3
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word 3-shingles, weighted by shingle count. None for short texts."""
+    words = WORD.findall(text.lower())
+    if len(words) < NEAR_DUP_MIN_WORDS:
+        return None
+    shingles = Counter(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    weights = [0] * SIGNATURE_BITS
+    for shingle, count in shingles.items():
+        value = _shingle_hash(shingle)
+        for bit in range(SIGNATURE_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def content_signature(paragraphs: List[str]) -> Optional[str]:
+    """Hex SimHash of the scraped paragraph text, as carried in the graph state."""
+    signature = simhash(" ".join(paragraphs))
+    return None if signature is None else f"{signature:016x}"
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def band_masks(max_hamming: int) -> List[tuple]:
+    """
+    (shift, mask) for max_hamming + 1 bands covering all 64 bits. Two signatures within
+    max_hamming bits of each other agree exactly on at least one band (pigeonhole).
+    """
+    bands = max_hamming + 1
+    widths = [SIGNATURE_BITS // bands + (1 if i < SIGNATURE_BITS % bands else 0) for i in range(bands)]
+    masks, shift = [], 0
+    for width in widths:
+        masks.append((shift, (1 << width) - 1))
+        shift += width
+    return masks
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """
+    SimHash signatures of indexed articles in SQLite, with banded LSH buckets so a lookup
+    only compares against signatures sharing a band instead of scanning every article.
+    """
+
+    def __init__(self, path: str = NEAR_DUP_INDEX_PATH, max_hamming: int = NEAR_DUP_MAX_HAMMING):
+        self.path = path
+        self.max_hamming = max_hamming
+        self.masks = band_masks(max_hamming)
+        self.lookups = 0
+        self.matches = 0
+        self.candidates_checked = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _bands(self, signature: int) -> List[tuple]:
+        return [(band, _signed(signature >> shift & mask)) for band, (shift, mask) in enumerate(self.masks)]
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                "id INTEGER PRIMARY KEY, signature INTEGER NOT NULL, url TEXT, title TEXT, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                "band INTEGER NOT NULL, value INTEGER NOT NULL, signature_id INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_lookup ON bands(band, value)")
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM settings WHERE key = 'max_hamming'").fetchone()
+            # The band layout depends on the threshold; re-bucket if it changed
+            if row is None or int(row[0]) != self.max_hamming:
+                self._rebuild_bands(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _rebuild_bands(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM bands")
+        for signature_id, signature in conn.execute("SELECT id, signature FROM signatures").fetchall():
+            conn.executemany(
+                "INSERT INTO bands (band, value, signature_id) VALUES (?, ?, ?)",
+                [(band, value, signature_id) for band, value in self._bands(_unsigned(signature))],
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('max_hamming', ?)", (str(self.max_hamming),)
+        )
+
+    def find(self, signature: int) -> Optional[Dict[str, Any]]:
+        """Closest indexed article within max_hamming bits, or None."""
+        bands = self._bands(signature)
+        clause = " OR ".join(["(b.band = ? AND b.value = ?)"] * len(bands))
+        params = [item for pair in bands for item in pair]
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT s.id, s.signature, s.url, s.title FROM bands b "
+                f"JOIN signatures s ON s.id = b.signature_id WHERE {clause}",
+                params,
+            ).fetchall()
+            self.lookups += 1
+            self.candidates_checked += len(rows)
+
+            best = None
+            for _, stored, url, title in rows:
+                distance = hamming(signature, _unsigned(stored))
+                if distance <= self.max_hamming and (best is None or distance < best["distance"]):
+                    best = {"url": url, "title": title, "distance": distance}
+            if best is not None:
+                self.matches += 1
+            return best
+
+    def add(self, signature: int, url: str, title: str):
+        with self._lock:
+            conn = self._db()
+            signature_id = conn.execute(
+                "INSERT INTO signatures (signature, url, title, created_at) VALUES (?, ?, ?, ?)",
+                (_signed(signature), url, title, time.time()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO bands (band, value, signature_id) VALUES (?, ?, ?)",
+                [(band, value, signature_id) for band, value in self._bands(signature)],
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM bands")
+            conn.execute("DELETE FROM signatures")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+        return {
+            "enabled": NEAR_DUP_ENABLED,
+            "entries": entries,
+            "max_hamming": self.max_hamming,
+            "bands": len(self.masks),
+            "lookups": self.lookups,
+            "matches": self.matches,
+            "avg_candidates_per_lookup": round(self.candidates_checked / self.lookups, 2) if self.lookups else 0.0,
+        }
+
+
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+from langchain_core.documents import Document
+
+from agents.duplicate_checker import FAISS_FOLDER, embedding_model
+from db.docstore import SQLiteDocstore, normalize_title
+from db.faiss_index import (
+    FAISS_INDEX_TYPE,
+    FAISS_IVF_TRAIN_THRESHOLD,
+    INDEX_TYPES,
+    build_index,
+    index_type,
+    lock_store,
+    write_index,
+)
+from db.mongo_client import close_mongo, get_results_collection
+
+# Mongo page size, texts per embedding request and embedding requests in flight
+REBUILD_PAGE_SIZE = int(os.getenv("REBUILD_PAGE_SIZE", "500"))
+REBUILD_BATCH_SIZE = int(os.getenv("REBUILD_BATCH_SIZE", "100"))
+REBUILD_CONCURRENCY = int(os.getenv("REBUILD_CONCURRENCY", "4"))
+
+# Retry policy for failed embedding batches
+REBUILD_MAX_RETRIES = int(os.getenv("REBUILD_MAX_RETRIES", "5"))
+REBUILD_BACKOFF_BASE = float(os.getenv("REBUILD_BACKOFF_BASE", "2.0"))
+REBUILD_BACKOFF_MAX = float(os.getenv("REBUILD_BACKOFF_MAX", "60"))
+
+CHECKPOINT_FILE = "rebuild.json"
+VECTORS_FILE = "vectors.f32"
+PROJECTION = {"input_url": 1, "metadata.title": 1, "metadata.meta_description": 1}
+
+
+def duplicate_entry(document: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, str]]]:
+    """(text, metadata) exactly as run_duplicate_checker indexes the article, or None without a title."""
+    metadata = document.get("metadata") or {}
+    original_title = str(metadata.get("title") or "").strip()
+    if not normalize_title(original_title):
+        return None
+    title = original_title.lower()
+    description = str(metadata.get("meta_description") or "").strip().lower()
+    return f"{title} - {description}", {
+        "title": title,
+        "original_title": original_title,
+        "normalized_title": normalize_title(original_title),
+        "url": str(document.get("input_url") or ""),
+    }
+
+
+def read_checkpoint(folder: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(folder, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_checkpoint(folder: str, checkpoint: Dict[str, Any]):
+    path = os.path.join(folder, CHECKPOINT_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class StagedIndex:
+    """
+    Rebuild output in a staging folder: the SQLite docstore, vectors appended as raw
+    float32 rows, and a checkpoint written after both. Each page is committed in that
+    order, so on resume the docstore and vector file are cut back to the checkpoint.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.checkpoint = self._read_checkpoint()
+        self.docstore = SQLiteDocstore(os.path.join(folder, "docstore.sqlite"))
+        self.vectors_path = os.path.join(folder, VECTORS_FILE)
+
+        count = self.count
+        if not self.complete:
+            dropped = self.docstore.truncate(count)
+            if dropped:
+                print(f"⚠️ Dropped {dropped} staged documents written after the last checkpoint")
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(count * self.dimension * 4 if self.dimension else 0)
+        self.seen_titles = set(self.docstore.title_index())
+
+    def _read_checkpoint(self) -> Dict[str, Any]:
+        return read_checkpoint(self.folder) or {
+            "count": 0, "scanned": 0, "skipped": 0, "last_id": None, "dimension": None, "complete": False,
+        }
+
+    def _write_checkpoint(self):
+        write_checkpoint(self.folder, self.checkpoint)
+
+    @property
+    def count(self) -> int:
+        return self.checkpoint["count"]
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self.checkpoint["dimension"]
+
+    @property
+    def complete(self) -> bool:
+        return self.checkpoint["complete"]
+
+    @property
+    def last_id(self) -> Optional[ObjectId]:
+        return ObjectId(self.checkpoint["last_id"]) if self.checkpoint["last_id"] else None
+
+    def append(self, entries: List[Tuple[str, Dict[str, str]]], vectors: List[List[float]], last_id: ObjectId, scanned: int, skipped: int):
+        if entries:
+            self.docstore.add({
+                str(uuid.uuid4()): Document(page_content=text, metadata=metadata)
+                for text, metadata in entries
+            })
+            self.docstore.commit()
+            rows = np.asarray(vectors, dtype=np.float32)
+            with open(self.vectors_path, "ab") as f:
+                rows.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            self.checkpoint["dimension"] = rows.shape[1]
+        self.checkpoint["count"] += len(entries)
+        self.checkpoint["scanned"] += scanned
+        self.checkpoint["skipped"] += skipped
+        self.checkpoint["last_id"] = str(last_id)
+        self._write_checkpoint()
+
+    def vectors(self) -> np.ndarray:
+        return np.fromfile(self.vectors_path, dtype=np.float32).reshape(-1, self.dimension)
+
+    def finish(self, kind: str) -> str:
+        """Writes the final index beside the docstore and marks the staging folder ready to swap."""
+        vectors = self.vectors()
+        # Like the live store, IVF is only trained once there is enough data for it
+        if kind == "ivf" and len(vectors) < FAISS_IVF_TRAIN_THRESHOLD:
+            kind = "flat"
+        index = build_index(vectors, kind)
+        write_index(index, os.path.join(self.folder, "index.faiss"))
+        self.checkpoint["complete"] = True
+        self._write_checkpoint()
+        os.remove(self.vectors_path)
+        return index_type(index)
+
+    def mark_swapped(self):
+        """Recorded before the swap starts, so a run that stops part way through can tell."""
+        self.checkpoint["swapped"] = True
+        self._write_checkpoint()
+
+    def close(self):
+        self.docstore.close()
+
+
+async def embed_batch(texts: List[str], semaphore: asyncio.Semaphore) -> List[List[float]]:
+    # Through the embedding cache, so a resumed or repeated rebuild re-embeds nothing it already has
+    for attempt in range(REBUILD_MAX_RETRIES + 1):
+        async with semaphore:
+            try:
+                return await embedding_model.aembed_documents(texts)
+            except Exception as e:
+                if attempt == REBUILD_MAX_RETRIES:
+                    raise
+                error = e
+        # Back off outside the semaphore so other batches keep the slot busy
+        delay = min(REBUILD_BACKOFF_MAX, REBUILD_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        print(f"⏳ Embedding batch of {len(texts)} failed ({error}), retrying in {delay:.1f}s (attempt {attempt + 1}/{REBUILD_MAX_RETRIES})")
+        await asyncio.sleep(delay)
+
+
+async def embed_all(texts: List[str], semaphore: asyncio.Semaphore) -> List[List[float]]:
+    batches = [texts[i:i + REBUILD_BATCH_SIZE] for i in range(0, len(texts), REBUILD_BATCH_SIZE)]
+    results = await asyncio.gather(*(embed_batch(batch, semaphore) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+async def fetch_page(after: Optional[ObjectId]) -> List[Dict[str, Any]]:
+    query = {"_id": {"$gt": after}} if after is not None else {}
+    cursor = get_results_collection().find(query, PROJECTION).sort("_id", 1).limit(REBUILD_PAGE_SIZE)
+    return await cursor.to_list(length=REBUILD_PAGE_SIZE)
+
+
+async def stream_into(stage: StagedIndex):
+    total = await get_results_collection().estimated_document_count()
+    semaphore = asyncio.Semaphore(REBUILD_CONCURRENCY)
+    started = time.perf_counter()
+    indexed_at_start = stage.count
+    scanned_at_start = stage.checkpoint["scanned"]
+    if stage.last_id is not None:
+        print(f"↩️ Resuming after {stage.last_id}: {stage.count} documents already staged")
+
+    # The next page is fetched while the current one is embedded
+    next_page = asyncio.create_task(fetch_page(stage.last_id))
+    try:
+        while True:
+            page = await next_page
+            if not page:
+                break
+            next_page = asyncio.create_task(fetch_page(page[-1]["_id"]))
+
+            entries = []
+            for document in page:
+                entry = duplicate_entry(document)
+                # Same title rule as the live store: keep the first article per normalized title
+                if entry is None or entry[1]["normalized_title"] in stage.seen_titles:
+                    continue
+                stage.seen_titles.add(entry[1]["normalized_title"])
+                entries.append(entry)
+
+            vectors = await embed_all([text for text, _ in entries], semaphore)
+            await asyncio.to_thread(stage.append, entries, vectors, page[-1]["_id"], len(page), len(page) - len(entries))
+
+            elapsed = time.perf_counter() - started
+            scanned = stage.checkpoint["scanned"]
+            rate = (scanned - scanned_at_start) / elapsed if elapsed else 0.0
+            progress = f" of ~{total} ({scanned / total:.0%})" if total else ""
+            print(
+                f"📦 Scanned {scanned}{progress}, indexed {stage.count}, skipped {stage.checkpoint['skipped']} "
+                f"| {rate:.1f} docs/s, {(stage.count - indexed_at_start) / elapsed if elapsed else 0.0:.1f} embeddings/s"
+            )
+    finally:
+        next_page.cancel()
+
+
+async def backfill_normalized_titles() -> int:
+    """
+    Sets normalized_title on results written before it was stored, so the duplicate path
+    can serve them by title. Safe to run while the app is up, and again at any time.
+    """
+    collection = get_results_collection()
+    updated, after = 0, None
+    while True:
+        query: Dict[str, Any] = {"normalized_title": {"$exists": False}}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        page = await collection.find(query, {"metadata.title": 1}).sort("_id", 1).limit(REBUILD_PAGE_SIZE).to_list(
+            length=REBUILD_PAGE_SIZE
+        )
+        if not page:
+            break
+        await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {"$set": {"normalized_title": normalize_title((document.get("metadata") or {}).get("title"))}},
+                )
+                for document in page
+            ],
+            ordered=False,
+        )
+        updated += len(page)
+        after = page[-1]["_id"]
+    if updated:
+        print(f"🏷️ Backfilled normalized_title on {updated} stored results")
+    return updated
+
+
+def swap(staging: str, folder: str) -> Optional[str]:
+    """
+    Moves the live folder aside and the staged one into place; returns the backup path. The
+    staged checkpoint is marked swapped first and removed last, so after a crash a checkpoint
+    left in the live folder means the swap already happened.
+    """
+    backup = None
+    if os.path.exists(folder):
+        backup = f"{folder}.bak-{time.strftime('%Y%m%d-%H%M%S')}"
+        os.rename(folder, backup)
+    os.rename(staging, folder)
+    os.remove(os.path.join(folder, CHECKPOINT_FILE))
+    return backup
+
+
+async def rebuild(folder: str, kind: str, fresh: bool):
+    folder = folder.rstrip(os.sep)
+    staging = folder + ".rebuild"
+
+    # A previous run stopped after moving the rebuilt store into place; only its cleanup is left
+    live_checkpoint = read_checkpoint(folder) if os.path.isdir(folder) else None
+    if not os.path.exists(staging) and live_checkpoint and live_checkpoint.get("swapped"):
+        os.remove(os.path.join(folder, CHECKPOINT_FILE))
+        if not fresh:
+            print(f"✅ The previous rebuild ({live_checkpoint['count']} documents) is already in place in {folder}")
+            return
+
+    await backfill_normalized_titles()
+
+    if fresh and os.path.exists(staging):
+        shutil.rmtree(staging)
+        print(f"🗑️ Discarded the previous staging folder {staging}")
+
+    started = time.perf_counter()
+    stage = StagedIndex(staging)
+    try:
+        # A previous run may have stopped between finishing and swapping
+        if not stage.complete:
+            await stream_into(stage)
+            if stage.count == 0:
+                print("❌ No compiled results with a title to index; the live store was left untouched")
+                sys.exit(1)
+            built = await asyncio.to_thread(stage.finish, kind)
+            print(f"🧠 Built {built} index with {stage.count} vectors")
+        stage.mark_swapped()
+    finally:
+        stage.close()
+
+    backup = swap(staging, folder)
+    print(f"✅ Rebuilt duplicate index in {folder} ({stage.count} documents) in {time.perf_counter() - started:.1f}s")
+    if backup:
+        print(f"📁 Previous store kept at {backup}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.rebuild_duplicate_index [flat|hnsw|ivf] [--folder rag_store/faiss_index] [--fresh]
+    #        python -m db.rebuild_duplicate_index --titles-only   (backfill normalized_title in Mongo only)
+    # Stop the app first; it holds the store's writer lock while running.
+    # An interrupted run resumes from its checkpoint when started again.
+    parser = argparse.ArgumentParser(prog="python -m db.rebuild_duplicate_index")
+    parser.add_argument("index_type", nargs="?", default=FAISS_INDEX_TYPE, choices=INDEX_TYPES)
+    parser.add_argument("--folder", default=FAISS_FOLDER)
+    parser.add_argument("--fresh", action="store_true", help="ignore any checkpoint and start over")
+    parser.add_argument("--titles-only", action="store_true",
+                        help="only backfill normalized_title on stored results (the app may keep running)")
+    args = parser.parse_args()
+    try:
+        if args.titles_only:
+            asyncio.run(backfill_normalized_titles())
+        else:
+            try:
+                lock = lock_store(args.folder)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            asyncio.run(rebuild(args.folder, args.index_type, args.fresh))
+            lock.close()
+    finally:
+        close_mongo()
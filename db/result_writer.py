@@ -0,0 +1,263 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from db.mongo_client import close_mongo, get_results_collection
+from db.rollups import apply_rollups, wait_for_rebuild
+from core.metrics import MONGO_DOCUMENTS_WRITTEN, MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, observe
+
+# Batch bounds and queue capacity (writers wait once the queue is full)
+RESULT_WRITER_BATCH_SIZE = int(os.getenv("RESULT_WRITER_BATCH_SIZE", "100"))
+RESULT_WRITER_FLUSH_INTERVAL = float(os.getenv("RESULT_WRITER_FLUSH_INTERVAL", "1.0"))
+RESULT_WRITER_MAX_QUEUE = int(os.getenv("RESULT_WRITER_MAX_QUEUE", "1000"))
+
+# Documents that fail to insert are retried with exponential backoff before being given up on
+RESULT_WRITER_MAX_RETRIES = int(os.getenv("RESULT_WRITER_MAX_RETRIES", "3"))
+RESULT_WRITER_RETRY_DELAY = float(os.getenv("RESULT_WRITER_RETRY_DELAY", "1.0"))
+
+# Documents that exhaust their retries are appended here (MongoDB extended JSON, one per line)
+# so they can be replayed with `python -m db.result_writer replay`
+DATA_DIR = os.getenv("DATA_DIR", "data")
+RESULT_WRITER_SPILL_PATH = os.getenv("RESULT_WRITER_SPILL_PATH", os.path.join(DATA_DIR, "unwritten_results.jsonl"))
+
+DUPLICATE_KEY_ERROR = 11000
+
+_STOP = object()
+
+
+class BufferedResultWriter:
+    """
+    Write-behind buffer for compiled results. Documents are grouped into insert_many
+    batches, flushed when a batch fills or the flush interval passes, and drained on stop.
+    Once stopped, late writes go straight to Mongo instead of restarting the buffer.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = RESULT_WRITER_BATCH_SIZE,
+        flush_interval: float = RESULT_WRITER_FLUSH_INTERVAL,
+        max_queue: int = RESULT_WRITER_MAX_QUEUE,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = False
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.spilled = 0
+        self.rollup_errors = 0
+        self.retries = 0
+        self.flushes = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        self._stopped = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, document: Dict[str, Any]):
+        if self._stopped:
+            self.enqueued += 1
+            await self._flush([document])
+            return
+        self.start()
+        if self._queue.full():
+            self.backpressure_waits += 1
+        self._pending.append(document)
+        await self._queue.put(document)
+        self.enqueued += 1
+
+    # Latest not-yet-written document for this article, so duplicates can be served
+    # before the batch containing the original reaches Mongo
+    def find_pending(self, input_url: str, normalized_title: str) -> Optional[Dict[str, Any]]:
+        for document in reversed(self._pending):
+            if (input_url and document.get("input_url") == input_url) or (
+                normalized_title and document.get("normalized_title") == normalized_title
+            ):
+                return document
+        return None
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._flush(batch)
+            finally:
+                # Batches leave the queue in FIFO order, so they are the oldest pending documents
+                del self._pending[: len(batch)]
+
+    # One insert_many attempt: returns (inserted, failed, error)
+    async def _insert(self, batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[Exception]]:
+        try:
+            # A rollup rebuild reads compiled_results; inserting now would race its swap
+            await wait_for_rebuild()
+            with observe(MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, "mongo:insert_many", operation="insert_many"):
+                await get_results_collection().insert_many(batch, ordered=False)
+            return batch, [], None
+        except BulkWriteError as e:
+            # Unordered: everything without a write error went in. insert_many sets _id on the
+            # documents, so a duplicate key on retry means an earlier attempt already stored it.
+            failed = {
+                error["index"] for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY_ERROR
+            }
+            print(f"⚠️ Partial insert: {e.details.get('nInserted', 0)} of {len(batch)} compiled results written")
+            return (
+                [document for index, document in enumerate(batch) if index not in failed],
+                [document for index, document in enumerate(batch) if index in failed],
+                e,
+            )
+        except Exception as e:
+            return [], batch, e
+
+    async def _record_inserted(self, documents: List[Dict[str, Any]]):
+        self.written += len(documents)
+        MONGO_DOCUMENTS_WRITTEN.inc(len(documents))
+        # Keep the dashboard rollups in step with what was just inserted
+        try:
+            with observe(MONGO_WRITE_DURATION, MONGO_WRITE_ERRORS, "mongo:rollups", operation="rollups"):
+                await apply_rollups(documents)
+        except Exception as e:
+            self.rollup_errors += 1
+            print(f"⚠️ Failed to update dashboard rollups (run `python -m db.rollups rebuild`): {e}")
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            remaining = batch
+            for attempt in range(RESULT_WRITER_MAX_RETRIES + 1):
+                inserted, remaining, error = await self._insert(remaining)
+                if inserted:
+                    await self._record_inserted(inserted)
+                if not remaining or attempt == RESULT_WRITER_MAX_RETRIES:
+                    break
+                self.retries += 1
+                delay = RESULT_WRITER_RETRY_DELAY * 2 ** attempt
+                print(f"⏳ Failed to write {len(remaining)} compiled results, retrying in {delay:.1f}s: {error}")
+                await asyncio.sleep(delay)
+            if remaining:
+                self.failed += len(remaining)
+                print(f"❌ Gave up on {len(remaining)} compiled results after {RESULT_WRITER_MAX_RETRIES + 1} attempts: {error}")
+                self._spill(remaining)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = round(elapsed_ms, 2)
+            self.max_flush_ms = round(max(self.max_flush_ms, elapsed_ms), 2)
+            self._total_flush_ms += elapsed_ms
+
+    # Keep documents Mongo would not take, so a later replay can insert them
+    def _spill(self, documents: List[Dict[str, Any]]):
+        for document in documents:
+            print(f"❌ Unwritten compiled result _id={document.get('_id')} input_url={document.get('input_url', '')!r}")
+        try:
+            os.makedirs(os.path.dirname(RESULT_WRITER_SPILL_PATH) or ".", exist_ok=True)
+            with open(RESULT_WRITER_SPILL_PATH, "a", encoding="utf-8") as f:
+                for document in documents:
+                    f.write(json_util.dumps(document) + "\n")
+            self.spilled += len(documents)
+            print(f"💾 Spilled {len(documents)} compiled results to {RESULT_WRITER_SPILL_PATH}")
+        except Exception as e:
+            print(f"⚠️ Failed to spill compiled results to {RESULT_WRITER_SPILL_PATH}: {e}")
+
+    # Flush everything still buffered and stop the background task (called on shutdown)
+    async def stop(self):
+        self._stopped = True
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        # Writers that were blocked on a full queue land behind _STOP; write them directly
+        while True:
+            # Let writers woken by the previous get finish their put
+            await asyncio.sleep(0)
+            if self._queue.empty():
+                break
+            batch = []
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                try:
+                    await self._flush(batch)
+                finally:
+                    del self._pending[: len(batch)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "spilled": self.spilled,
+            "rollup_errors": self.rollup_errors,
+            "retries": self.retries,
+            "flushes": self.flushes,
+            "backpressure_waits": self.backpressure_waits,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+result_writer = BufferedResultWriter()
+
+
+# Re-insert spilled documents; anything that still fails is spilled again
+async def replay_spilled():
+    # A file left by an interrupted replay is picked up before the current spill file
+    replaying = RESULT_WRITER_SPILL_PATH + ".replaying"
+    if not os.path.exists(replaying):
+        if not os.path.exists(RESULT_WRITER_SPILL_PATH):
+            print(f"✅ Nothing to replay: {RESULT_WRITER_SPILL_PATH} does not exist")
+            return
+        os.replace(RESULT_WRITER_SPILL_PATH, replaying)
+    with open(replaying, encoding="utf-8") as f:
+        documents = [json_util.loads(line) for line in f if line.strip()]
+    writer = BufferedResultWriter()
+    for start in range(0, len(documents), writer.batch_size):
+        await writer._flush(documents[start:start + writer.batch_size])
+    os.remove(replaying)
+    print(f"🔁 Replayed {len(documents)} compiled results: {writer.written} written, {writer.spilled} spilled again")
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.result_writer replay
+    if sys.argv[1:] != ["replay"]:
+        print("Usage: python -m db.result_writer replay")
+        sys.exit(1)
+    try:
+        asyncio.run(replay_spilled())
+    finally:
+        close_mongo()
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from db.mongo_client import close_mongo, get_db, get_results_collection
+
+ROLLUP_COLLECTION = "dashboard_rollups"
+TOTALS_ID = "all"
+
+# While a rebuild holds this lock, result writers hold their batches, so every compiled
+# result is either in the rebuild's scan or inserted (and counted) after the swap
+ROLLUP_LOCK_COLLECTION = "dashboard_rollups_lock"
+REBUILD_LOCK_ID = "rebuild"
+# How long the rebuild waits for flushes that started before the lock was taken
+# (longer than a flush including its retries)
+ROLLUP_REBUILD_GRACE = float(os.getenv("ROLLUP_REBUILD_GRACE", "15"))
+# A lock not refreshed for this long belongs to a crashed rebuild and is ignored
+ROLLUP_REBUILD_LOCK_TTL = float(os.getenv("ROLLUP_REBUILD_LOCK_TTL", "300"))
+ROLLUP_PAUSE_POLL_INTERVAL = 1.0
+
+# Histogram buckets are 10 points wide, keyed by their lower bound ("0", "10", ... "100")
+BUCKET_WIDTH = 10
+SCORE_FIELDS = ("relevance", "credibility", "completeness", "trend_score", "total")
+
+
+def get_rollups_collection():
+    return get_db()[ROLLUP_COLLECTION]
+
+
+def get_lock_collection():
+    return get_db()[ROLLUP_LOCK_COLLECTION]
+
+
+async def rebuild_in_progress() -> bool:
+    lock = await get_lock_collection().find_one({"_id": REBUILD_LOCK_ID})
+    return lock is not None and lock["expires_at"] > datetime.utcnow()
+
+
+# Called by the result writer before each insert
+async def wait_for_rebuild():
+    paused = False
+    while await rebuild_in_progress():
+        if not paused:
+            print("⏸️ Dashboard rollup rebuild in progress, holding compiled-result writes")
+            paused = True
+        await asyncio.sleep(ROLLUP_PAUSE_POLL_INTERVAL)
+    if paused:
+        print("▶️ Rollup rebuild finished, resuming compiled-result writes")
+
+
+async def acquire_rebuild_lock():
+    now = datetime.utcnow()
+    locks = get_lock_collection()
+    # Take over a lock left behind by a rebuild that died
+    await locks.delete_one({"_id": REBUILD_LOCK_ID, "expires_at": {"$lte": now}})
+    try:
+        await locks.insert_one({
+            "_id": REBUILD_LOCK_ID,
+            "started_at": now,
+            "expires_at": now + timedelta(seconds=ROLLUP_REBUILD_LOCK_TTL),
+        })
+    except DuplicateKeyError:
+        raise RuntimeError("Another rollup rebuild is already running")
+
+
+async def refresh_rebuild_lock():
+    await get_lock_collection().update_one(
+        {"_id": REBUILD_LOCK_ID},
+        {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=ROLLUP_REBUILD_LOCK_TTL)}},
+    )
+
+
+async def release_rebuild_lock():
+    await get_lock_collection().delete_one({"_id": REBUILD_LOCK_ID})
+
+
+def day_id(timestamp: datetime) -> str:
+    return f"day:{timestamp.strftime('%Y-%m-%d')}"
+
+
+def _bucket(value: float) -> str:
+    return str(min(int(value // BUCKET_WIDTH) * BUCKET_WIDTH, 100))
+
+
+def rollup_increments(document: Dict[str, Any]) -> Dict[str, float]:
+    """$inc fields contributed by one compiled result, applied to both the day and the totals rollup."""
+    scores = document.get("scores") or {}
+    values = {
+        "relevance": scores.get("relevance") or 0,
+        "credibility": scores.get("credibility") or 0,
+        "completeness": scores.get("completeness") or 0,
+        "trend_score": document.get("trend_score") or 0,
+    }
+    values["total"] = values["relevance"] + values["credibility"] + values["completeness"]
+
+    increments = {"count": 1, "content_exists": 1 if document.get("content_exists") else 0}
+    for field, value in values.items():
+        increments[f"sums.{field}"] = value
+        increments[f"hist.{field}.{_bucket(value)}"] = 1
+    return increments
+
+
+def group_increments(documents: Iterable[Dict[str, Any]], grouped=None) -> Dict[str, Dict[str, float]]:
+    if grouped is None:
+        grouped = defaultdict(lambda: defaultdict(int))
+    for document in documents:
+        increments = rollup_increments(document)
+        timestamp = document.get("timestamp") or datetime.utcnow()
+        for rollup_id in (TOTALS_ID, day_id(timestamp)):
+            for field, value in increments.items():
+                grouped[rollup_id][field] += value
+    return grouped
+
+
+# Called after each batch of compiled results is inserted
+async def apply_rollups(documents: List[Dict[str, Any]]):
+    grouped = group_increments(documents)
+    if not grouped:
+        return
+    now = datetime.utcnow()
+    await get_rollups_collection().bulk_write(
+        [
+            UpdateOne({"_id": rollup_id}, {"$inc": dict(increments), "$set": {"updated_at": now}}, upsert=True)
+            for rollup_id, increments in grouped.items()
+        ],
+        ordered=False,
+    )
+
+
+def summarize(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    count = rollup.get("count", 0)
+    sums = rollup.get("sums", {})
+    return {
+        "count": count,
+        "content_exists": rollup.get("content_exists", 0),
+        "averages": {field: round(sums.get(field, 0) / count, 2) if count else 0.0 for field in SCORE_FIELDS},
+        "histograms": rollup.get("hist", {}),
+    }
+
+
+# Reads one totals document and at most `days` day documents, whatever the collection size
+async def get_dashboard_stats(days: int) -> Dict[str, Any]:
+    rollups = get_rollups_collection()
+    totals = await rollups.find_one({"_id": TOTALS_ID}) or {}
+    today = datetime.utcnow()
+    first_day = day_id(today - timedelta(days=days - 1))
+    daily = await rollups.find(
+        {"_id": {"$gte": first_day, "$lte": day_id(today)}}
+    ).sort("_id", 1).to_list(length=days)
+    return {
+        "totals": summarize(totals),
+        "daily": [{"date": rollup["_id"][len("day:"):], **summarize(rollup)} for rollup in daily],
+        "updated_at": totals.get("updated_at"),
+    }
+
+
+# Recompute every rollup from compiled_results and swap the new collection in. Result
+# writers in every app process pause for the duration, so no increment is lost or doubled.
+async def rebuild_rollups(page_size: int = 1000) -> int:
+    await acquire_rebuild_lock()
+    try:
+        print(f"⏸️ Result writers paused; waiting {ROLLUP_REBUILD_GRACE:g}s for in-flight flushes")
+        await asyncio.sleep(ROLLUP_REBUILD_GRACE)
+        return await _rebuild_rollups(page_size)
+    finally:
+        await release_rebuild_lock()
+
+
+async def _rebuild_rollups(page_size: int) -> int:
+    started = time.perf_counter()
+    projection = {"timestamp": 1, "scores": 1, "trend_score": 1, "content_exists": 1}
+    grouped: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    processed = 0
+
+    cursor = get_results_collection().find({}, projection, batch_size=page_size)
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= page_size:
+            group_increments(batch, grouped)
+            processed += len(batch)
+            batch = []
+            await refresh_rebuild_lock()
+            print(f"   ...{processed} documents")
+    group_increments(batch, grouped)
+    processed += len(batch)
+
+    staging = get_db()[f"{ROLLUP_COLLECTION}_rebuild"]
+    await staging.drop()
+    now = datetime.utcnow()
+    if grouped:
+        await staging.bulk_write(
+            [
+                UpdateOne({"_id": rollup_id}, {"$inc": dict(increments), "$set": {"updated_at": now}}, upsert=True)
+                for rollup_id, increments in grouped.items()
+            ],
+            ordered=False,
+        )
+        await staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+    else:
+        await get_rollups_collection().drop()
+
+    print(f"✅ Rebuilt {len(grouped)} rollups from {processed} documents in {time.perf_counter() - started:.1f}s")
+    return processed
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.rollups rebuild
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m db.rollups rebuild")
+        sys.exit(1)
+    try:
+        asyncio.run(rebuild_rollups())
+    finally:
+        close_mongo()
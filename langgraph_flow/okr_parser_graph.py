@@ -1,27 +1,94 @@
-from langgraph.graph import StateGraph
-from agents.okr_parser import run_parser_agent
+from langgraph.graph import END, StateGraph
+from agents.okr_parser import run_article_fetcher, run_parser_agent
 from agents.duplicate_checker import run_duplicate_checker
 from agents.content_verifier import run_content_verifier_agent
 from agents.trend_discrepancy_analyser import run_trend_discrepancy_analyzer
 from agents.results_compiler import run_results_compiler 
+from agents.stored_result_loader import run_stored_result_loader
+from agents.fused_evaluator import run_fused_evaluator
 from models.schema import OKRParserState
+from core.metrics import instrument_node
+
+# A failed scrape ends the run; its error is the result the client gets back
+def route_after_scrape(state: dict) -> str:
+    return "error" if state.get("error") else "ok"
+
+# Duplicates skip every remaining LLM/Tavily stage and are served from Mongo
+def route_after_duplicate_check(state: dict) -> str:
+    if state.get("error"):
+        return "error"
+    return "duplicate" if state.get("duplicate_check_result") == "fail" else "unique"
+
+# Staged graph: unique articles fan out to both evaluation branches at once
+def route_to_evaluation(state: dict):
+    route = route_after_duplicate_check(state)
+    if route != "unique":
+        return route
+    return ["verify", "trend"]
 
 def build_okr_parser_graph():
     workflow = StateGraph(OKRParserState)
 
-    # Nodes
-    workflow.add_node("OKRParser", run_parser_agent)
-    workflow.add_node("DuplicateChecker", run_duplicate_checker)
-    workflow.add_node("ContentVerifier", run_content_verifier_agent)
-    workflow.add_node("TrendDiscrepancyAnalyzer", run_trend_discrepancy_analyzer)
-    workflow.add_node("ResultsCompiler", run_results_compiler)
+    # Nodes (each returns only the state keys it owns), timed per execution
+    workflow.add_node("OKRParser", instrument_node("OKRParser", run_parser_agent))
+    workflow.add_node("DuplicateChecker", instrument_node("DuplicateChecker", run_duplicate_checker))
+    workflow.add_node("StoredResultLoader", instrument_node("StoredResultLoader", run_stored_result_loader))
+    workflow.add_node("ContentVerifier", instrument_node("ContentVerifier", run_content_verifier_agent))
+    workflow.add_node("TrendDiscrepancyAnalyzer", instrument_node("TrendDiscrepancyAnalyzer", run_trend_discrepancy_analyzer))
+    workflow.add_node("ResultsCompiler", instrument_node("ResultsCompiler", run_results_compiler))
 
     # Edges
     workflow.set_entry_point("OKRParser")
-    workflow.add_edge("OKRParser", "DuplicateChecker")
-    workflow.add_edge("DuplicateChecker", "ContentVerifier")
-    workflow.add_edge("ContentVerifier", "TrendDiscrepancyAnalyzer")
-    workflow.add_edge("TrendDiscrepancyAnalyzer", "ResultsCompiler") 
+    workflow.add_conditional_edges(
+        "OKRParser",
+        route_after_scrape,
+        {"error": END, "ok": "DuplicateChecker"},
+    )
+    # Fan out: verification runs alongside the trend analysis. A conditional edge may
+    # return several destinations; plain edges can't fan out without a reducer key.
+    workflow.add_conditional_edges(
+        "DuplicateChecker",
+        route_to_evaluation,
+        {
+            "error": END,
+            "duplicate": "StoredResultLoader",
+            "verify": "ContentVerifier",
+            "trend": "TrendDiscrepancyAnalyzer",
+        },
+    )
+    workflow.add_edge("StoredResultLoader", END)
+
+    # Fan in: the compiler waits for both branches. Branches write disjoint keys,
+    # so the merged state does not depend on which one finishes first.
+    workflow.add_edge(["ContentVerifier", "TrendDiscrepancyAnalyzer"], "ResultsCompiler")
     workflow.set_finish_point("ResultsCompiler")  
 
     return workflow.compile()
+
+# Fused mode: scrape, duplicate check, then one combined LLM call. ResultsCompiler only
+# calls its own LLM if the fused output is missing the compiled report.
+def build_fused_okr_graph():
+    workflow = StateGraph(OKRParserState)
+
+    workflow.add_node("ArticleFetcher", instrument_node("ArticleFetcher", run_article_fetcher))
+    workflow.add_node("DuplicateChecker", instrument_node("DuplicateChecker", run_duplicate_checker))
+    workflow.add_node("StoredResultLoader", instrument_node("StoredResultLoader", run_stored_result_loader))
+    workflow.add_node("FusedEvaluator", instrument_node("FusedEvaluator", run_fused_evaluator))
+    workflow.add_node("ResultsCompiler", instrument_node("ResultsCompiler", run_results_compiler))
+
+    workflow.set_entry_point("ArticleFetcher")
+    workflow.add_conditional_edges(
+        "ArticleFetcher",
+        route_after_scrape,
+        {"error": END, "ok": "DuplicateChecker"},
+    )
+    workflow.add_conditional_edges(
+        "DuplicateChecker",
+        route_after_duplicate_check,
+        {"error": END, "duplicate": "StoredResultLoader", "unique": "FusedEvaluator"},
+    )
+    workflow.add_edge("StoredResultLoader", END)
+    workflow.add_edge("FusedEvaluator", "ResultsCompiler")
+    workflow.set_finish_point("ResultsCompiler")
+
+    return workflow.compile()
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+from core.singleflight import SingleFlight, canonicalize_url
+from langgraph_flow.okr_parser_graph import build_fused_okr_graph, build_okr_parser_graph
+
+# How long a completed run is served to repeat requests for the same URL
+URL_RESULT_TTL = float(os.getenv("URL_RESULT_TTL", "60"))
+
+# "staged" runs one LLM call per stage; "fused" does parse/verify/discrepancy in one call
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "staged")
+
+# Initialize the OKR parser LangGraphs
+graphs = {
+    "staged": build_okr_parser_graph(),
+    "fused": build_fused_okr_graph(),
+}
+
+def get_graph(mode: Optional[str] = None):
+    return graphs[mode or PIPELINE_MODE]
+
+# Concurrent requests for the same canonical URL share one graph execution
+pipeline_flights = SingleFlight(result_ttl=URL_RESULT_TTL)
+
+# Working state that only the graph needs; the scraped article text is never returned
+PRIVATE_STATE_KEYS = ("article_text",)
+
+def public_state(state: Optional[dict]) -> Optional[dict]:
+    if state is None:
+        return None
+    return {key: value for key, value in state.items() if key not in PRIVATE_STATE_KEYS}
+
+async def invoke_graph(url: str, mode: str) -> dict:
+    return public_state(await get_graph(mode).ainvoke(initial_state(url)))
+
+def initial_state(url: str) -> dict:
+    return {
+        "input_url": url,
+        "parsed_okr": None,
+        "metadata": None
+    }
+
+async def run_okr_pipeline(url: str, mode: Optional[str] = None) -> dict:
+    mode = mode or PIPELINE_MODE
+    result = await pipeline_flights.do(
+        f"{mode}:{canonicalize_url(url)}",
+        lambda: invoke_graph(url, mode),
+        # Failed scrapes are retried on the next request rather than cached
+        cache_if=lambda result: not result.get("error"),
+    )
+    # Coalesced and cached callers share one result; each gets a copy carrying its own URL
+    return {**result, "input_url": url}
+
+# Run many URLs with at most `concurrency` graphs in flight, yielding each outcome
+# as soon as it completes. Failures are reported per URL and never abort the batch.
+async def run_okr_batch(urls: List[str], concurrency: int, mode: Optional[str] = None) -> AsyncIterator[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int, url: str) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await run_okr_pipeline(url, mode)
+                if result.get("error"):
+                    outcome = {"status": "error", "error": result["error"]}
+                else:
+                    outcome = {"status": "ok", "result": result}
+            except Exception as e:
+                print(f"❌ Batch item failed for {url}: {e}")
+                outcome = {"status": "error", "error": str(e)}
+            return {
+                "index": index,
+                "url": url,
+                **outcome,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+
+    tasks = [asyncio.create_task(run_one(index, url)) for index, url in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away (or we finished): drop whatever has not started yet
+        for task in tasks:
+            task.cancel()
+
+# Drive the graph with its streaming API and yield one event per finished node,
+# carrying that node's state delta and timing. Closing the iterator stops the run.
+async def stream_okr_pipeline(url: str, mode: Optional[str] = None) -> AsyncIterator[dict]:
+    started = last = time.perf_counter()
+    final_state = None
+    try:
+        async with aclosing(get_graph(mode).astream(initial_state(url))) as chunks:
+            async for chunk in chunks:
+                now = time.perf_counter()
+                for node, delta in chunk.items():
+                    if node == "__end__":
+                        final_state = delta
+                        continue
+                    yield {
+                        "event": "node",
+                        "data": {
+                            "node": node,
+                            "delta": public_state(delta),
+                            "step_ms": round((now - last) * 1000, 1),
+                            "elapsed_ms": round((now - started) * 1000, 1),
+                        },
+                    }
+                last = now
+    except Exception as e:
+        print(f"❌ Streaming run failed for {url}: {e}")
+        yield {"event": "error", "data": {"error": str(e)}}
+        return
+
+    yield {
+        "event": "done",
+        "data": {"elapsed_ms": round((time.perf_counter() - started) * 1000, 1), "result": public_state(final_state)},
+    }
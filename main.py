@@ -1,13 +1,68 @@
-from fastapi import FastAPI, Query
+import asyncio
+import json
+import os
+import time
+from contextlib import aclosing, asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from datetime import datetime
+from typing import List, Literal, Optional
 from bson import ObjectId
 
-from langgraph_flow.okr_parser_graph import build_okr_parser_graph
-from motor.motor_asyncio import AsyncIOMotorClient
+from langgraph_flow.pipeline import pipeline_flights, run_okr_batch, run_okr_pipeline, stream_okr_pipeline
+from models.schema import BatchParseRequest, JobRequest, PipelineMode
+from agents.duplicate_checker import (
+    embedding_model,
+    init_faiss_store,
+    start_faiss_flusher,
+    stop_faiss_flusher,
+)
+from db.llm_cache import llm_cache_stats
+from db.mongo_client import close_mongo, get_results_collection, init_mongo
+from db.result_writer import result_writer
+from db.rollups import get_dashboard_stats
+from db.dashboard_queries import RESULTS_SORT, SUMMARY_PROJECTION, build_results_query, encode_cursor, json_default
+from core.http_pool import start_http_clients, close_http_clients, http_pool_stats
+from core.job_queue import JobQueue
+from core.llm_scheduler import llm_scheduler
+from core.metrics import REQUEST_DURATION, record_cache_stats, registry, render_metrics
+from core.tracing import finish_trace, get_trace, new_request_id, start_trace
+from tools.trend_analyzer_tool import trend_cache
+from db.near_duplicate_index import near_duplicate_index
+from db.job_store import JobStore
+
+# Dashboard page size limits
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
+DASHBOARD_MAX_PAGE_SIZE = int(os.getenv("DASHBOARD_MAX_PAGE_SIZE", "500"))
+
+# Batch ingestion limits
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "5000"))
+
+# Background evaluation jobs, persisted so a restart doesn't lose queued work
+job_queue = JobQueue(JobStore(), run_okr_pipeline)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled HTTP clients shared by the scraper and Tavily tools
+    app.state.http_clients = start_http_clients()
+    # Single pooled Mongo client plus the buffered compiled-results writer
+    await init_mongo()
+    result_writer.start()
+    # Load the duplicate store once and persist it in the background
+    await init_faiss_store()
+    start_faiss_flusher()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await result_writer.stop()
+    await stop_faiss_flusher()
+    await close_http_clients()
+    close_mongo()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration to allow frontend requests
 app.add_middleware(
@@ -18,13 +73,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the OKR parser LangGraph
-graph = build_okr_parser_graph()
+# Request id on every request (taken from X-Request-ID when the caller sends one), API
+# latency histogram, and the per-request trace when TRACE_REQUESTS is on. For streamed
+# responses the timing covers the time to the response headers.
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    trace = start_trace(request_id, f"{request.method} {request.url.path}")
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = request.scope.get("route")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+        finish_trace(trace)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+# Cache hit ratios are derived from each cache's own counters at scrape time
+def collect_cache_metrics():
+    record_cache_stats("embedding", embedding_model.stats())
+    for chain, stats in llm_cache_stats()["chains"].items():
+        if "hits" in stats:
+            record_cache_stats(f"llm_{chain}", stats)
+    record_cache_stats("trend", trend_cache.stats(), hits=("hits", "stale_hits"))
+    # Requests served without a graph run, either coalesced or from the short result cache
+    record_cache_stats(
+        "pipeline_result",
+        pipeline_flights.stats(),
+        hits=("result_cache_hits", "absorbed_requests"),
+        misses=("runs",),
+    )
 
-# MongoDB connection
-client = AsyncIOMotorClient("mongodb://localhost:27017")
-db = client["okr_database"]
-results_collection = db["compiled_results"]
+registry.add_collector(collect_cache_metrics)
 
 # Utility to convert MongoDB ObjectId to string
 def fix_object_id(doc):
@@ -33,21 +121,175 @@ def fix_object_id(doc):
 
 # Existing OKR Parser API
 @app.get("/parse-okr/")
-async def parse_okr(url: str = Query(...)):
-    initial_state = {
-        "input_url": url,
-        "parsed_okr": None,
-        "metadata": None
-    }
-    result = await graph.ainvoke(initial_state)
+async def parse_okr(url: str = Query(...), mode: Optional[PipelineMode] = None):
+    result = await run_okr_pipeline(url, mode)
     return result
 
-# Fetch all compiled OKR results for dashboard
-@app.get("/dashboard/results", response_model=List[dict])
-async def get_all_compiled_results():
+# Server-Sent Events: one event per finished graph node, then a final "done" event.
+# Disconnecting stops the run at the next node boundary.
+@app.get("/parse-okr/stream")
+async def parse_okr_stream(request: Request, url: str = Query(...), mode: Optional[PipelineMode] = None):
+    async def sse_events():
+        async with aclosing(stream_okr_pipeline(url, mode)) as events:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+    return StreamingResponse(
+        sse_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Batch ingestion: one NDJSON line per URL, streamed in completion order
+@app.post("/parse-okr/batch")
+async def parse_okr_batch(request: BatchParseRequest):
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+
+    async def ndjson_lines():
+        async for item in run_okr_batch(request.urls, concurrency, request.mode):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+# Queue an evaluation and return immediately; poll GET /jobs/{job_id} for the result
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    job = await job_queue.submit(request.url, request.priority, request.mode)
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Deprecated: newest compiled results only, capped like a page. Use /dashboard/results/page,
+# which can page through everything.
+@app.get("/dashboard/results", response_model=List[dict], deprecated=True)
+async def get_all_compiled_results(response: Response, limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1)):
+    limit = min(limit, DASHBOARD_MAX_PAGE_SIZE)
+    response.headers["Deprecation"] = "true"
+    response.headers["Link"] = '</dashboard/results/page>; rel="successor-version"'
     try:
-        cursor = results_collection.find({})
-        results = await cursor.to_list(length=None)
+        cursor = get_results_collection().find({}).sort(RESULTS_SORT).limit(limit)
+        results = await cursor.to_list(length=limit)
         return [fix_object_id(doc) for doc in results]
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+# Paginated dashboard results: keyset cursor on (timestamp, _id), projected list view,
+# score/date filters, streamed as it is read from Mongo. A page cut short by a Mongo error
+# ends with an "error" field.
+@app.get("/dashboard/results/page")
+async def get_compiled_results_page(
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    view: Literal["summary", "full"] = "summary",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_relevance: Optional[float] = None,
+    max_relevance: Optional[float] = None,
+    min_credibility: Optional[float] = None,
+    max_credibility: Optional[float] = None,
+    min_completeness: Optional[float] = None,
+    max_completeness: Optional[float] = None,
+    min_trend_score: Optional[float] = None,
+    max_trend_score: Optional[float] = None,
+):
+    limit = min(limit, DASHBOARD_MAX_PAGE_SIZE)
+    try:
+        query = build_results_query(
+            cursor=cursor,
+            since=since,
+            until=until,
+            score_ranges={
+                "relevance": (min_relevance, max_relevance),
+                "credibility": (min_credibility, max_credibility),
+                "completeness": (min_completeness, max_completeness),
+                "trend_score": (min_trend_score, max_trend_score),
+            },
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    projection = SUMMARY_PROJECTION if view == "summary" else None
+    # One extra document tells us whether there is a next page
+    documents = get_results_collection().find(query, projection).sort(RESULTS_SORT).limit(limit + 1)
+
+    # Read the first document before answering, so a failing query is a 500 rather than a 200
+    try:
+        first = await documents.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+    async def read_documents():
+        if first is not None:
+            yield first
+            async for document in documents:
+                yield document
+
+    async def json_page():
+        yield '{"items":['
+        last = None
+        count = 0
+        try:
+            async for document in read_documents():
+                if count == limit:
+                    yield f'],"next_cursor":{json.dumps(encode_cursor(last))}}}'
+                    return
+                if count:
+                    yield ","
+                yield json.dumps(fix_object_id(dict(document)), default=json_default)
+                last = {"timestamp": document["timestamp"], "_id": document["_id"]}
+                count += 1
+        except Exception as e:
+            print(f"❌ Dashboard page stream failed after {count} items: {e}")
+            # The 200 is already sent; close the JSON with an error so clients see a partial page
+            yield f'],"next_cursor":null,"error":{json.dumps(str(e))}}}'
+            return
+        yield '],"next_cursor":null}'
+
+    return StreamingResponse(json_page(), media_type="application/json")
+
+# Aggregate dashboard view served from incrementally maintained rollups
+@app.get("/dashboard/stats")
+async def get_dashboard_statistics(days: int = Query(30, ge=1, le=366)):
+    try:
+        return await get_dashboard_stats(days)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+# Cache and pool statistics
+@app.get("/stats")
+async def get_stats():
+    return {
+        "embedding_cache": embedding_model.stats(),
+        "llm_cache": llm_cache_stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "trend_cache": trend_cache.stats(),
+        "near_duplicate_index": await asyncio.to_thread(near_duplicate_index.stats),
+        "http_pools": http_pool_stats(),
+        "pipeline_singleflight": pipeline_flights.stats(),
+        "job_queue": await job_queue.stats(),
+        "result_writer": result_writer.stats(),
+    }
+
+# Prometheus scrape endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Spans recorded for a recent request (requires TRACE_REQUESTS=true)
+@app.get("/traces/{request_id}")
+async def get_request_trace(request_id: str):
+    trace = get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
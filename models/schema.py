@@ -1,8 +1,12 @@
-from typing import TypedDict, Optional, Literal, Dict, Any
+from typing import TypedDict, Optional, Literal, Dict, Any, List
 from pydantic import BaseModel
 
+PipelineMode = Literal["staged", "fused"]
+
 class OKRParserState(TypedDict, total=False):
     input_url: str
+    article_text: Optional[str]
+    compression: Optional[Dict[str, Any]]
     parsed_okr: Optional[Dict[str, Any]]
     metadata: Optional[Dict[str, Any]]
     title: Optional[str]
@@ -16,8 +20,22 @@ class OKRParserState(TypedDict, total=False):
     trend_score: Optional[float]
     trend_summary: Optional[str]
     compiled_results: Optional[Dict[str, Any]]
+    duplicate_of: Optional[str]
+    content_signature: Optional[str]
+    near_duplicate_of: Optional[Dict[str, Any]]
+    error: Optional[str]
 
 class ContentVerifierInput(BaseModel):
     input_url: str
     metadata: Optional[Dict[str, Any]] = None
     duplicate_check_result: Optional[Literal["pass", "fail"]] = None
+
+class BatchParseRequest(BaseModel):
+    urls: List[str]
+    concurrency: Optional[int] = None
+    mode: Optional[PipelineMode] = None
+
+class JobRequest(BaseModel):
+    url: str
+    priority: int = 0
+    mode: Optional[PipelineMode] = None
@@ -0,0 +1,51 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+fused_evaluation_prompt = ChatPromptTemplate.from_template(
+    """You are an OKR extraction and evaluation assistant. In a single pass, extract the OKR
+from the article, score the content, check it against the trend data, and compile a report.
+
+TITLE: "{title}"
+METADATA: "{meta_description}"
+
+Trend Analysis:
+Trend Score: {trend_score}
+Summary: {trend_summary}
+
+Article Text:
+{article_text}
+
+Tasks:
+1. Extract the main objective and 2–5 measurable key results from the article.
+2. Score the content: relevance to professional OKRs or career development (out of 50),
+   credibility of source and quality of content (out of 30), completeness of the description
+   and context (out of 20). Verdict is "fail" if the total is below 60.
+3. Identify discrepancies: misalignment with the objective/key results, low trend relevance
+   (trend score < 60), missing or incomplete data.
+4. Compile the report: a 2 sentence summary, whether content exists, the scores with their
+   total, 3–5 recommendations based on the discrepancies, and a 4–5 line feedback paragraph
+   in a professional tone.
+
+Respond strictly in valid JSON, with no extra text, in this format:
+{{
+  "objective": "string",
+  "key_results": ["string", "..."],
+  "verification": {{
+    "relevance": <score_out_of_50>,
+    "credibility": <score_out_of_30>,
+    "completeness": <score_out_of_20>,
+    "verdict": "pass" or "fail"
+  }},
+  "discrepancy": {{
+    "discrepancy_found": true or false,
+    "issues": ["string"],
+    "suggestions": ["string"]
+  }},
+  "compiled": {{
+    "content_summary": "string",
+    "content_exists": true or false,
+    "ai_scores": {{"relevance": 0, "credibility": 0, "completeness": 0, "total": 0}},
+    "recommendations": ["string"],
+    "detailed_feedback": "string"
+  }}
+}}"""
+)
@@ -0,0 +1,196 @@
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget for the article text, estimated at ~4 characters per token
+ARTICLE_TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", "1000"))
+ARTICLE_COMPRESSION = os.getenv("ARTICLE_COMPRESSION", "true").lower() == "true"
+CHARS_PER_TOKEN = 4
+
+# Sentences beyond this are dropped before ranking to bound the O(n^2) similarity graph
+MAX_RANKED_SENTENCES = 400
+
+# Sentences this similar to one already selected add no new information
+REDUNDANCY_THRESHOLD = 0.6
+
+BOILERPLATE = re.compile(
+    r"cookie|sign in|sign up|log in|subscribe|accept all|privacy policy|terms of (use|service)|"
+    r"all rights reserved|follow us|share this|click here|newsletter|report this|skip to (main )?content",
+    re.IGNORECASE,
+)
+# Short page chrome that carries a number ("12 reactions", "3d", "1 week ago")
+ENGAGEMENT = re.compile(
+    r"^[\d,.]+[km]?\s*(likes?|comments?|reactions?|reposts?|shares?|followers?|views?)\b|"
+    r"^\d+\s*(s|m|h|d|w|mo|y|yr|sec|min|hour|day|week|month|year)s?( ago)?\b",
+    re.IGNORECASE,
+)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[\"'“(\[A-Z0-9])")
+WORD = re.compile(r"[a-z0-9%]+")
+NUMBER = re.compile(r"\d")
+
+# Terms that mark goal- and metric-bearing sentences, which the parser prompt needs most
+GOAL_TERMS = {
+    "goal", "goals", "objective", "objectives", "target", "targets", "okr", "okrs", "kpi", "kpis",
+    "metric", "metrics", "milestone", "milestones", "increase", "reduce", "improve", "achieve",
+    "grow", "growth", "deliver", "launch", "revenue", "retention", "conversion", "quarter",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "for", "from", "has", "have",
+    "he", "her", "his", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "our", "she",
+    "so", "that", "the", "their", "them", "they", "this", "to", "was", "we", "were", "what",
+    "when", "which", "who", "will", "with", "you", "your",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def is_key_result_line(paragraph: str) -> bool:
+    """Short lines with a number or a goal term are usually KRs or metrics ("Revenue up 40%")."""
+    if ENGAGEMENT.search(paragraph):
+        return False
+    return bool(NUMBER.search(paragraph) or GOAL_TERMS.intersection(WORD.findall(paragraph.lower())))
+
+
+def filter_boilerplate(paragraphs: List[str]) -> List[str]:
+    kept, seen = [], set()
+    for paragraph in paragraphs:
+        paragraph = " ".join(paragraph.split())
+        words = len(paragraph.split())
+        key = paragraph.lower()
+        if not words or key in seen:
+            continue
+        if words < 25 and BOILERPLATE.search(paragraph):
+            continue
+        # Other short fragments are navigation and button labels
+        if words < 5 and not is_key_result_line(paragraph):
+            continue
+        seen.add(key)
+        kept.append(paragraph)
+    return kept
+
+
+def split_sentences(paragraphs: List[str]) -> List[str]:
+    return [sentence for paragraph in paragraphs for sentence in SENTENCE_SPLIT.split(paragraph) if sentence]
+
+
+def _terms(sentence: str) -> List[str]:
+    return [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS]
+
+
+def sentence_vectors(sentences: List[str]) -> List[Dict[str, float]]:
+    """Unit-length TF-IDF vectors, treating each sentence as a document."""
+    terms = [_terms(sentence) for sentence in sentences]
+    document_frequency = Counter(term for sentence_terms in terms for term in set(sentence_terms))
+    count = len(sentences)
+
+    vectors = []
+    for sentence_terms in terms:
+        frequencies = Counter(sentence_terms)
+        vector = {term: tf * math.log(1 + count / document_frequency[term]) for term, tf in frequencies.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors
+
+
+def cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    small, large = (a, b) if len(a) < len(b) else (b, a)
+    return sum(weight * large.get(term, 0.0) for term, weight in small.items())
+
+
+def jaccard(a: Dict[str, float], b: Dict[str, float]) -> float:
+    union = len(a.keys() | b.keys())
+    return len(a.keys() & b.keys()) / union if union else 0.0
+
+
+def rank_sentences(
+    sentences: List[str],
+    vectors: List[Dict[str, float]],
+    iterations: int = 20,
+    damping: float = 0.85,
+) -> List[float]:
+    """TextRank over the sentence similarity graph, boosted for numbers and goal/metric terms."""
+    count = len(sentences)
+    edges: List[Dict[int, float]] = [{} for _ in range(count)]
+    for i in range(count):
+        for j in range(i + 1, count):
+            similarity = cosine(vectors[i], vectors[j])
+            if similarity > 0:
+                edges[i][j] = similarity
+                edges[j][i] = similarity
+    out_weight = [sum(neighbours.values()) or 1.0 for neighbours in edges]
+
+    scores = [1.0] * count
+    for _ in range(iterations):
+        scores = [
+            (1 - damping) + damping * sum(scores[j] * weight / out_weight[j] for j, weight in edges[i].items())
+            for i in range(count)
+        ]
+
+    boosted = []
+    for index, (sentence, vector) in enumerate(zip(sentences, vectors)):
+        boost = 1.0
+        if NUMBER.search(sentence):
+            boost += 0.5
+        if GOAL_TERMS.intersection(vector):
+            boost += 1.0
+        # Lead sentences usually state the topic
+        if index < 3:
+            boost += 0.25
+        boosted.append(scores[index] * boost)
+    return boosted
+
+
+def compress_article(paragraphs: List[str], token_budget: int = ARTICLE_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """
+    Extractive compression: drop boilerplate, split into sentences, keep the most salient
+    ones within the token budget, in their original order. Returns (text, stats).
+    """
+    started = time.perf_counter()
+    original = " ".join(paragraphs)
+    char_budget = token_budget * CHARS_PER_TOKEN
+
+    if not ARTICLE_COMPRESSION:
+        text = original[:char_budget]
+        method = "truncate"
+    else:
+        cleaned = filter_boilerplate(paragraphs)
+        text = " ".join(cleaned)
+        method = "boilerplate_filter"
+        if len(text) > char_budget:
+            sentences = split_sentences(cleaned)[:MAX_RANKED_SENTENCES]
+            vectors = sentence_vectors(sentences)
+            scores = rank_sentences(sentences, vectors)
+            selected, used = [], 0
+            for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+                length = len(sentences[index]) + 1
+                if used + length > char_budget:
+                    continue
+                # Skip near-repeats of something already kept (word overlap, not IDF-weighted,
+                # so a single rare token doesn't make two copies look different)
+                if any(jaccard(vectors[index], vectors[kept]) > REDUNDANCY_THRESHOLD for kept in selected):
+                    continue
+                selected.append(index)
+                used += length
+            text = " ".join(sentences[index] for index in sorted(selected))
+            method = "textrank"
+
+    original_tokens = estimate_tokens(original)
+    compressed_tokens = estimate_tokens(text)
+    stats = {
+        "method": method,
+        "original_tokens": original_tokens,
+        "compressed_tokens": compressed_tokens,
+        "ratio": round(compressed_tokens / original_tokens, 3) if original_tokens else 1.0,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info(f"Compressed article text: {stats}")
+    return text, stats
@@ -1,10 +1,13 @@
 from langchain_core.tools import tool
 from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.gemini import ScheduledChatModel
 from prompts.content_verifier_prompt import content_verifier_prompt
+from db.llm_cache import get_llm_cache
+from core.metrics import llm_callbacks
+from core.llm_scheduler import llm_scheduler
 from typing import Optional, Dict, Any, Literal
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+llm = ScheduledChatModel(model="gemini-2.0-flash", cache=get_llm_cache("content_verifier"), callbacks=llm_callbacks("gemini-2.0-flash"))
 chain = content_verifier_prompt | llm | StrOutputParser()
 
 @tool()
@@ -35,10 +38,10 @@ async def content_verifier_tool(
             state_dict["content_verification_result"] = "missing_title_or_description"
             return state_dict
 
-        result = await chain.ainvoke({
+        result = await llm_scheduler.run(llm.model, lambda: chain.ainvoke({
             "title": title,
             "meta_description": description
-        })
+        }))
 
         state_dict["content_verification_result"] = result.strip()
         return state_dict
@@ -1,21 +1,133 @@
+import asyncio
+import codecs
+import os
 import httpx
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from typing import Optional
+from core.http_pool import get_http_client
+from core.metrics import HTTP_DURATION, HTTP_ERRORS, observe
 
-async def scrape_linkedin_article(url: str) -> dict:
+# Hard cap on downloaded bytes and on extracted paragraph text. The text budget is larger
+# than the prompt budget because tools/article_compressor.py selects from it afterwards.
+SCRAPER_MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", str(2 * 1024 * 1024)))
+SCRAPER_TEXT_BUDGET = int(os.getenv("SCRAPER_TEXT_BUDGET", "16000"))
+
+# Body chunks are batched to roughly this size before each off-loop parse step
+PARSE_BATCH_BYTES = 64 * 1024
+
+
+class ArticleExtractor(HTMLParser):
+    """
+    Single-pass, event-driven extraction of <title>, the description <meta> and <p> text.
+    Fed incrementally; `done` flips once the paragraph text budget is filled.
+    """
+
+    def __init__(self, text_budget: int = SCRAPER_TEXT_BUDGET):
+        super().__init__(convert_charrefs=True)
+        self.text_budget = text_budget
+        self.title = None
+        self.meta_description = None
+        self.paragraphs = []
+        self._text_len = 0
+        self._title_parts = None
+        self._paragraph_parts = None
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self._text_len >= self.text_budget
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag == "meta" and self.meta_description is None:
+            attrs = dict(attrs)
+            if (attrs.get("name") or "").lower() == "description" and attrs.get("content") is not None:
+                self.meta_description = attrs["content"]
+        elif tag == "p":
+            # An open <p> is implicitly closed by the next one
+            self._close_paragraph()
+            self._paragraph_parts = []
+        elif tag in ("script", "style"):
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+        elif tag == "p":
+            self._close_paragraph()
+        elif tag in ("script", "style") and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        elif self._paragraph_parts is not None:
+            self._paragraph_parts.append(data)
+
+    def _close_paragraph(self):
+        if self._paragraph_parts is None:
+            return
+        text = "".join(self._paragraph_parts)
+        self._paragraph_parts = None
+        # Joined with single spaces, so each paragraph after the first costs one extra char
+        self._text_len += len(text) + (1 if self.paragraphs else 0)
+        self.paragraphs.append(text)
+
+    def finish(self):
+        self.close()
+        self._close_paragraph()
+        if self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+
+    def text(self) -> str:
+        return " ".join(self.paragraphs)[: self.text_budget]
+
+
+def _feed(extractor: ArticleExtractor, decoder, data: bytes, final: bool = False):
+    extractor.feed(decoder.decode(data, final=final))
+    if final:
+        extractor.finish()
+
+
+async def scrape_linkedin_article(url: str, client: Optional[httpx.AsyncClient] = None) -> dict:
+    extractor = ArticleExtractor(SCRAPER_TEXT_BUDGET)
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, follow_redirects=True, timeout=10)
-            response.raise_for_status()
+        # Shared pooled client unless the caller injects one
+        client = client or get_http_client(url)
+        # Timed through the end of the read, since the body is streamed
+        with observe(HTTP_DURATION, HTTP_ERRORS, "scrape", upstream="article"):
+            async with client.stream("GET", url, follow_redirects=True, timeout=10) as response:
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+
+                # Read incrementally and parse off the event loop; stop at the byte cap
+                # or as soon as enough paragraph text has been collected
+                received = 0
+                pending = []
+                pending_size = 0
+                async for chunk in response.aiter_bytes():
+                    chunk = chunk[: SCRAPER_MAX_BYTES - received]
+                    received += len(chunk)
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= PARSE_BATCH_BYTES or received >= SCRAPER_MAX_BYTES:
+                        await asyncio.to_thread(_feed, extractor, decoder, b"".join(pending))
+                        pending, pending_size = [], 0
+                        if extractor.done or received >= SCRAPER_MAX_BYTES:
+                            break
     except Exception as e:
         return {"error": f"Failed to fetch the URL: {str(e)}"}
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    article_text = " ".join([p.text for p in soup.find_all("p")])[:4000]
+    await asyncio.to_thread(_feed, extractor, decoder, b"".join(pending), True)
 
     metadata = {
-        "title": soup.title.string if soup.title else "Unknown",
-        "meta_description": soup.find("meta", attrs={"name": "description"})["content"]
-        if soup.find("meta", attrs={"name": "description"}) else "None"
+        "title": extractor.title if extractor.title is not None else "Unknown",
+        "meta_description": extractor.meta_description if extractor.meta_description is not None else "None",
     }
 
-    return {"text": article_text, "metadata": metadata}
+    return {"text": extractor.text(), "paragraphs": extractor.paragraphs, "metadata": metadata}
@@ -3,8 +3,11 @@ import json
 import re
 from typing import List
 from langchain_core.tools import tool
-from langchain_google_genai import ChatGoogleGenerativeAI
+from core.gemini import ScheduledChatModel
 from prompts.results_compiler_prompt import results_compiler_prompt
+from db.llm_cache import get_llm_cache
+from core.metrics import llm_callbacks
+from core.llm_scheduler import llm_scheduler
 
 # Logger Setup
 logger = logging.getLogger("results_compiler_tool")
@@ -15,7 +18,7 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 # LLM Setup
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
+llm = ScheduledChatModel(model="gemini-1.5-flash", cache=get_llm_cache("results_compiler"), callbacks=llm_callbacks("gemini-1.5-flash"))
 chain = results_compiler_prompt | llm
 
 @tool
@@ -52,7 +55,7 @@ async def compile_results_tool(
     logger.info(json.dumps(input_vars, indent=2))
 
     try:
-        result = await chain.ainvoke(input_vars)
+        result = await llm_scheduler.run(llm.model, lambda: chain.ainvoke(input_vars))
         raw_content = result.content.strip()
         logger.info("📥 Raw response:\n%s", raw_content)
 
@@ -1,17 +1,240 @@
 from langchain_core.tools import tool
 from typing import List, Optional, Dict, Any
+import asyncio
 import httpx
+import json
 import os
 import logging
+import re
+import sqlite3
+import threading
+import time
+from core.http_pool import get_http_client
+from core.metrics import HTTP_DURATION, HTTP_ERRORS, observe
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Tavily API configuration
-TAVILY_API_URL = "https://api.tavily.com/search"  # Verify this is correct
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com/search")  # Verify this is correct
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Trend lookup cache: fresh for TREND_CACHE_TTL, then served stale (while a background
+# refresh runs) for up to TREND_CACHE_STALE_TTL more seconds
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+TREND_CACHE_PATH = os.getenv("TREND_CACHE_PATH", os.path.join(CACHE_DIR, "trend_cache.sqlite"))
+TREND_CACHE_TTL = float(os.getenv("TREND_CACHE_TTL", str(6 * 3600)))
+TREND_CACHE_STALE_TTL = float(os.getenv("TREND_CACHE_STALE_TTL", str(24 * 3600)))
+
+KEYWORD_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "its", "of", "on", "or", "our", "the", "their", "to", "with", "your", "we", "will", "this",
+}
+STEM_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ed", "es", "ly", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)] + ("y" if suffix == "ies" else "")
+            break
+    # "increase" and "increasing" should meet at "increas"
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def normalize_keywords(keywords: List[str]) -> List[str]:
+    """Lowercased, punctuation-free, stopword-free, stemmed, de-duplicated and sorted."""
+    words = re.findall(r"[a-z0-9]+", " ".join(keywords).lower())
+    return sorted({_stem(word) for word in words if word not in KEYWORD_STOPWORDS})
+
+
+def trend_cache_key(keywords: List[str], timeframe: str, region: str, max_results: int) -> str:
+    return "|".join([" ".join(normalize_keywords(keywords)), timeframe, region, str(max_results)])
+
+
+class TrendCache:
+    """Persistent SQLite store for successful Tavily lookups, with hit/miss accounting."""
+
+    def __init__(self, path: str = TREND_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refreshing = set()
+        self._tasks = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.external_calls = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trends (key TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db().execute("SELECT response, fetched_at FROM trends WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def set(self, key: str, response: Dict[str, Any]):
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO trends (key, response, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(response), time.time()),
+            )
+            # Entries past the stale window can never be served again
+            conn.execute("DELETE FROM trends WHERE fetched_at < ?", (time.time() - TREND_CACHE_TTL - TREND_CACHE_STALE_TTL,))
+            conn.commit()
+
+    async def fetch_and_store(self, key: str, keywords: List[str], max_results: int) -> Dict[str, Any]:
+        self.external_calls += 1
+        result = await fetch_tavily_trends(keywords, max_results)
+        if result.get("success"):
+            await asyncio.to_thread(self.set, key, result)
+        return result
+
+    # Stale-while-revalidate: at most one background refresh per key
+    def refresh_in_background(self, key: str, keywords: List[str], max_results: int):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self.refreshes += 1
+
+        async def refresh():
+            try:
+                await self.fetch_and_store(key, keywords, max_results)
+            except Exception as e:
+                logger.error(f"Background trend refresh failed for '{key}': {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "background_refreshes": self.refreshes,
+            "external_calls": self.external_calls,
+            "external_calls_avoided": self.hits + self.stale_hits,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": TREND_CACHE_TTL,
+            "stale_ttl_seconds": TREND_CACHE_STALE_TTL,
+        }
+
+
+trend_cache = TrendCache()
+
+
+async def fetch_tavily_trends(keywords: List[str], max_results: int = 10) -> Dict[str, Any]:
+    """Uncached Tavily search; see tavily_trend_check_tool for the cached entry point."""
+    query = " ".join(keywords)
+    logger.info(f"Analyzing trends for keywords: {keywords}")
+
+    headers = {
+        "Authorization": f"Bearer {TAVILY_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+    payload = {
+        "query": query,
+        "search_depth": "advanced",
+        "topic": "news",
+        "max_results": max_results,
+        "include_answer": True,
+        "include_raw_content": False,
+        # Add timeframe and region if Tavily supports them
+        # "timeframe": timeframe,
+        # "region": region,
+    }
+
+    client = get_http_client(TAVILY_API_URL)
+    try:
+        logger.info(f"Making request to Tavily API: {TAVILY_API_URL}")
+        with observe(HTTP_DURATION, HTTP_ERRORS, "tavily", upstream="tavily"):
+            response = await client.post(TAVILY_API_URL, json=payload, headers=headers, timeout=30.0)
+            response.raise_for_status()
+        data = response.json()
+
+        # Process Tavily response - adjust based on actual API response format
+        results = data.get("results", [])
+        answer = data.get("answer", "")
+        
+        # Calculate a simple trend score based on result count and recency
+        trend_score = min(len(results) * 10, 100)  # Cap at 100
+        
+        # Create trend summary
+        if results:
+            recent_titles = [result.get("title", "") for result in results[:3]]
+            trend_summary = f"Found {len(results)} recent mentions. Recent topics: {', '.join(recent_titles[:2])}"
+            if answer:
+                trend_summary += f"\n\nSummary: {answer[:200]}..."
+        else:
+            trend_summary = "No recent trend data found for these keywords"
+
+        logger.info(f"Successfully analyzed trends. Score: {trend_score}")
+        
+        return {
+            "success": True,
+            "trend_score": trend_score,
+            "trend_summary": trend_summary,
+            "query": query,
+            "results_count": len(results),
+            "raw_results": results[:5],  # Include top 5 results
+            "answer": answer
+        }
+
+    except httpx.HTTPStatusError as e:
+        error_msg = f"HTTP error from Tavily API: {e.response.status_code}"
+        if e.response.status_code == 401:
+            error_msg += " - Invalid API key"
+        elif e.response.status_code == 429:
+            error_msg += " - Rate limit exceeded"
+        
+        logger.error(f"{error_msg} - {e.response.text}")
+        return {
+            "success": False,
+            "error": error_msg,
+            "trend_score": 0,
+            "trend_summary": "Error fetching trend data due to API error"
+        }
+        
+    except httpx.TimeoutException:
+        logger.error("Timeout occurred while calling Tavily API")
+        return {
+            "success": False,
+            "error": "Request timeout",
+            "trend_score": 0,
+            "trend_summary": "Error fetching trend data due to timeout"
+        }
+        
+    except Exception as e:
+        logger.error(f"Unexpected error calling Tavily API: {e}")
+        return {
+            "success": False,
+            "error": f"Unexpected error: {str(e)}",
+            "trend_score": 0,
+            "trend_summary": "Error fetching trend data due to unexpected error"
+        }
+
+
 @tool()
 async def tavily_trend_check_tool(
     keywords: List[str], 
@@ -21,6 +244,7 @@ async def tavily_trend_check_tool(
 ) -> Dict[str, Any]:
     """
     Calls Tavily API with keywords and returns trend analysis data.
+    Lookups are cached on the normalized keywords, timeframe and region.
     
     Args:
         keywords: List of keywords to analyze trends for
@@ -48,90 +272,19 @@ async def tavily_trend_check_tool(
             "trend_summary": "No keywords to analyze"
         }
 
-    query = " ".join(keywords)
-    logger.info(f"Analyzing trends for keywords: {keywords}")
-
-    headers = {
-        "Authorization": f"Bearer {TAVILY_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "query": query,
-        "search_depth": "advanced",
-        "topic": "news",
-        "max_results": max_results,
-        "include_answer": True,
-        "include_raw_content": False,
-        # Add timeframe and region if Tavily supports them
-        # "timeframe": timeframe,
-        # "region": region,
-    }
+    key = trend_cache_key(keywords, timeframe, region, max_results)
+    cached = await asyncio.to_thread(trend_cache.get, key)
+    if cached is not None:
+        response, age = cached
+        if age <= TREND_CACHE_TTL:
+            trend_cache.hits += 1
+            logger.info(f"Trend cache hit for '{key}' (age {age:.0f}s)")
+            return response
+        if age <= TREND_CACHE_TTL + TREND_CACHE_STALE_TTL:
+            trend_cache.stale_hits += 1
+            logger.info(f"Serving stale trend data for '{key}' (age {age:.0f}s), refreshing")
+            trend_cache.refresh_in_background(key, keywords, max_results)
+            return response
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            logger.info(f"Making request to Tavily API: {TAVILY_API_URL}")
-            response = await client.post(TAVILY_API_URL, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            # Process Tavily response - adjust based on actual API response format
-            results = data.get("results", [])
-            answer = data.get("answer", "")
-            
-            # Calculate a simple trend score based on result count and recency
-            trend_score = min(len(results) * 10, 100)  # Cap at 100
-            
-            # Create trend summary
-            if results:
-                recent_titles = [result.get("title", "") for result in results[:3]]
-                trend_summary = f"Found {len(results)} recent mentions. Recent topics: {', '.join(recent_titles[:2])}"
-                if answer:
-                    trend_summary += f"\n\nSummary: {answer[:200]}..."
-            else:
-                trend_summary = "No recent trend data found for these keywords"
-
-            logger.info(f"Successfully analyzed trends. Score: {trend_score}")
-            
-            return {
-                "success": True,
-                "trend_score": trend_score,
-                "trend_summary": trend_summary,
-                "query": query,
-                "results_count": len(results),
-                "raw_results": results[:5],  # Include top 5 results
-                "answer": answer
-            }
-
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error from Tavily API: {e.response.status_code}"
-            if e.response.status_code == 401:
-                error_msg += " - Invalid API key"
-            elif e.response.status_code == 429:
-                error_msg += " - Rate limit exceeded"
-            
-            logger.error(f"{error_msg} - {e.response.text}")
-            return {
-                "success": False,
-                "error": error_msg,
-                "trend_score": 0,
-                "trend_summary": "Error fetching trend data due to API error"
-            }
-            
-        except httpx.TimeoutException:
-            logger.error("Timeout occurred while calling Tavily API")
-            return {
-                "success": False,
-                "error": "Request timeout",
-                "trend_score": 0,
-                "trend_summary": "Error fetching trend data due to timeout"
-            }
-            
-        except Exception as e:
-            logger.error(f"Unexpected error calling Tavily API: {e}")
-            return {
-                "success": False,
-                "error": f"Unexpected error: {str(e)}",
-                "trend_score": 0,
-                "trend_summary": "Error fetching trend data due to unexpected error"
-            }
\ No newline at end of file
+    trend_cache.misses += 1
+    return await trend_cache.fetch_and_store(key, keywords, max_results)